@@ -0,0 +1,444 @@
+"""
+AetherMart M4: Parallel, Chunked ETL Runner for aethermart_dw
+
+Drives the star-schema load from Python instead of one long
+sp_run_etl_pipeline() call:
+  1. plan      -- fact_sales / fact_reviews source keys above the watermark
+                  (etl_watermark) are split into ETL_CHUNK_ROWS-wide PK ranges
+                  recorded in etl_chunk. The upper bound is captured BEFORE
+                  the dimensions load, so every planned fact finds its
+                  customer / product.
+  2. dimensions -- dim_customer, dim_product and the dim_date calendar load in
+                  parallel, one connection per worker (same upserts as
+                  sp_run_etl_incremental()).
+  3. facts     -- all chunks share one worker pool. Each chunk is a short
+                  transaction that inserts its rows and marks the chunk DONE,
+                  so no statement holds a long transaction / large undo log
+                  (or a huge Galera write set).
+  4. watermark -- advanced over the contiguous DONE prefix, but never past
+                  the MAX(id) the PREVIOUS run saw (pending_hi): ids near the
+                  current MAX may belong to inserts not yet committed, so they
+                  are scanned again next run (the same safety lag as
+                  sp_run_etl_incremental()). Finished chunks are removed.
+
+A run that fails part-way leaves its unfinished chunks PENDING; the next
+run resumes them before planning new ones. Re-scanning is safe: the chunk
+inserts skip keys that are already loaded. Requires the schema and
+procedures from Milestone4_task2_etl_pipeline.sql. Do not run it while
+sp_run_etl_pipeline() / sp_run_etl_incremental() are running.
+
+    python3 Milestone4_task2_etl_runner.py              # incremental
+    python3 Milestone4_task2_etl_runner.py --full       # rebuild the DW
+    python3 Milestone4_task2_etl_runner.py --workers 8 --chunk-rows 50000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pymysql
+
+# --- CONFIGURATION ---
+MARIA_DB_HOST = "localhost"
+MARIA_DB_USER = "alex"
+MARIA_DB_PASS = "alex_pass"
+DW_DB_NAME = "aethermart_dw"
+SOURCE_DB_NAME = "aethermart_db"
+
+ETL_WORKERS = int(os.environ.get('ETL_WORKERS', 4))
+ETL_CHUNK_ROWS = int(os.environ.get('ETL_CHUNK_ROWS', 20000))   # source PKs per chunk transaction
+ETL_CHUNK_RETRIES = 3                                            # deadlock / certification retries
+
+DW_TABLES = ['fact_sales', 'fact_reviews', 'dim_customer', 'dim_product', 'dim_date', 'etl_chunk']
+
+# Dimension loads, run concurrently (procedures from Milestone4_task2_etl_pipeline.sql)
+DIMENSION_LOADS = {
+    'dim_customer': "CALL sp_upsert_dim_customer()",
+    'dim_product': "CALL sp_upsert_dim_product()",
+    # Calendar from the earliest order/review through one year ahead (existing days are kept)
+    'dim_date': f"""
+        CALL sp_fill_dim_date(
+            -- LEAST() is NULL if either argument is, so default each side on its own
+            LEAST(COALESCE((SELECT MIN(order_date) FROM {SOURCE_DB_NAME}.Orders), CURDATE()),
+                  COALESCE((SELECT MIN(review_date) FROM {SOURCE_DB_NAME}.Reviews), CURDATE())),
+            GREATEST(CURDATE() + INTERVAL 1 YEAR,
+                     COALESCE((SELECT MAX(order_date) FROM {SOURCE_DB_NAME}.Orders), CURDATE()),
+                     COALESCE((SELECT MAX(review_date) FROM {SOURCE_DB_NAME}.Reviews), CURDATE())))
+    """,
+}
+
+# Fact loads: source table (= etl_watermark / etl_chunk key), its PK, and the
+# chunk INSERT ... SELECT bounded by %(lo)s..%(hi)s on that PK.
+FACT_LOADS = {
+    'fact_sales': {
+        'source_table': 'Order_Items',
+        'key': 'order_item_id',
+        'sql': f"""
+            INSERT INTO fact_sales (order_item_id, order_id, date_key, customer_key, product_key,
+                                    quantity, price_per_unit, total_sale)
+            SELECT
+                oi.order_item_id,
+                o.order_id,
+                DATE_FORMAT(o.order_date, '%%Y%%m%%d'),
+                o.customer_id,
+                oi.product_id,
+                oi.quantity,
+                oi.price,
+                (oi.quantity * oi.price)
+            FROM {SOURCE_DB_NAME}.Order_Items oi
+            JOIN {SOURCE_DB_NAME}.Orders o ON o.order_id = oi.order_id
+            WHERE oi.order_item_id BETWEEN %(lo)s AND %(hi)s
+              AND o.order_date IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM fact_sales f WHERE f.order_item_id = oi.order_item_id)
+        """,
+    },
+    'fact_reviews': {
+        'source_table': 'Reviews',
+        'key': 'review_id',
+        'sql': f"""
+            INSERT INTO fact_reviews (review_key, product_key, customer_key, date_key, rating)
+            SELECT
+                r.review_id,
+                r.product_id,
+                r.customer_id,
+                DATE_FORMAT(r.review_date, '%%Y%%m%%d'),
+                r.rating
+            FROM {SOURCE_DB_NAME}.Reviews r
+            WHERE r.review_id BETWEEN %(lo)s AND %(hi)s
+              AND r.review_date IS NOT NULL AND r.rating > 0 -- Data quality check
+              AND NOT EXISTS (SELECT 1 FROM fact_reviews f WHERE f.review_key = r.review_id)
+        """,
+    },
+}
+
+
+def open_dw():
+    return pymysql.connect(
+        host=MARIA_DB_HOST,
+        user=MARIA_DB_USER,
+        password=MARIA_DB_PASS,
+        database=DW_DB_NAME,
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+
+class WorkerConnections:
+    """One DW connection per worker thread, opened on first use."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.opened = []
+
+    def get(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = open_dw()
+            with self.lock:
+                self.opened.append(conn)
+        return conn
+
+    def reset(self):
+        """Drops this thread's connection after an error; the next get() reconnects."""
+        conn = getattr(self.local, 'conn', None)
+        self.local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        with self.lock:
+            for conn in self.opened:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self.opened = []
+
+
+class StageTimer:
+    """Collects wall-clock time per pipeline stage for the final summary."""
+
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name, func, *args):
+        print(f"\n--- {name} ---")
+        started_at = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started_at
+        self.stages.append((name, elapsed))
+        print(f"⏱️ {name}: {elapsed:.2f}s")
+        return result
+
+    def report(self):
+        total = sum(elapsed for _, elapsed in self.stages)
+        print("\n--- Stage Timings ---")
+        for name, elapsed in self.stages:
+            print(f"   {name:<12} {elapsed:8.2f}s  {elapsed / max(total, 1e-9):6.1%}")
+        print(f"   {'total':<12} {total:8.2f}s")
+
+
+# --- STAGE: FULL RESET ---
+def reset_warehouse(conn):
+    """--full: empties the DW and rewinds the watermarks to 0."""
+    with conn.cursor() as cursor:
+        cursor.execute("SET FOREIGN_KEY_CHECKS=0")
+        for table in DW_TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+        cursor.execute("SET FOREIGN_KEY_CHECKS=1")
+        cursor.execute("UPDATE etl_watermark SET last_id = 0, last_run_at = NOW(), rows_loaded = NULL")
+    conn.commit()
+    print(f"✅ Truncated {', '.join(DW_TABLES)}; watermarks reset.")
+
+
+# --- STAGE: PLAN ---
+def split_range(lo, hi, chunk_rows):
+    """[(lo, hi)] pieces of at most chunk_rows keys covering lo..hi."""
+    return [(start, min(start + chunk_rows - 1, hi)) for start in range(lo, hi + 1, chunk_rows)]
+
+
+def plan_chunks(conn, chunk_rows):
+    """
+    Covers every key above the watermark, up to the current max, with
+    chunks: ranges no leftover chunk covers get new ones (including the
+    safety-lag window loaded last run), and leftover DONE chunks of a
+    failed run are re-scanned. Returns (every PENDING chunk as
+    [(fact_table, lo, hi)], {fact_table: (safe_hi, hi)}) where safe_hi is
+    the previous run's MAX: the furthest this run may move the watermark.
+    """
+    chunks = []
+    bounds = {}
+    with conn.cursor() as cursor:
+        for fact_table, spec in FACT_LOADS.items():
+            source_table = spec['source_table']
+            cursor.execute("SELECT last_id, pending_hi FROM etl_watermark WHERE source_table = %s",
+                           (source_table,))
+            row = cursor.fetchone()
+            if row is None:
+                raise RuntimeError(f"etl_watermark has no row for {source_table}; "
+                                   f"re-apply Milestone4_task2_etl_pipeline.sql")
+            cursor.execute(f"SELECT COALESCE(MAX({spec['key']}), 0) AS hi FROM {SOURCE_DB_NAME}.{source_table}")
+            hi = cursor.fetchone()['hi']
+            bounds[fact_table] = (row['pending_hi'], hi)
+
+            # A leftover DONE chunk was loaded while ids in it may still have been
+            # uncommitted; it is scanned again before the watermark can pass it
+            cursor.execute("UPDATE etl_chunk SET status = 'PENDING' WHERE source_table = %s AND status = 'DONE'",
+                           (source_table,))
+            cursor.execute("""
+                SELECT chunk_lo, chunk_hi FROM etl_chunk
+                WHERE source_table = %s AND chunk_hi > %s
+                ORDER BY chunk_lo
+            """, (source_table, row['last_id']))
+            new_chunks = []
+            start = row['last_id'] + 1
+            for planned in cursor.fetchall():
+                new_chunks += split_range(start, planned['chunk_lo'] - 1, chunk_rows)
+                start = max(start, planned['chunk_hi'] + 1)
+            new_chunks += split_range(start, hi, chunk_rows)
+            if new_chunks:
+                cursor.executemany(
+                    "INSERT INTO etl_chunk (source_table, chunk_lo, chunk_hi) VALUES (%s, %s, %s)",
+                    [(source_table, lo, chunk_hi) for lo, chunk_hi in new_chunks]
+                )
+            cursor.execute("""
+                SELECT chunk_lo, chunk_hi FROM etl_chunk
+                WHERE source_table = %s AND status = 'PENDING'
+                ORDER BY chunk_lo
+            """, (source_table,))
+            pending = [(fact_table, r['chunk_lo'], r['chunk_hi']) for r in cursor.fetchall()]
+            resumed = len(pending) - len(new_chunks)
+            print(f"📋 {fact_table}: {len(new_chunks)} new chunks up to {source_table}.{spec['key']}={hi}"
+                  + (f", {resumed} resumed from a failed run" if resumed else ""))
+            chunks += pending
+    conn.commit()
+    return chunks, bounds
+
+
+# --- STAGE: DIMENSIONS ---
+def load_dimension(connections, dim_table):
+    conn = connections.get()
+    started_at = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(DIMENSION_LOADS[dim_table])
+            rows = cursor.rowcount
+        conn.commit()
+    except Exception:
+        connections.reset()
+        raise
+    return rows, time.perf_counter() - started_at
+
+
+def load_dimensions(connections, workers):
+    """Loads every dimension concurrently. Raises if any of them failed."""
+    failed = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(DIMENSION_LOADS)), thread_name_prefix='etl-dim') as pool:
+        futures = {pool.submit(load_dimension, connections, dim): dim for dim in DIMENSION_LOADS}
+        for future in as_completed(futures):
+            dim_table = futures[future]
+            try:
+                rows, elapsed = future.result()
+                print(f"✅ {dim_table}: {rows} rows written in {elapsed:.2f}s")
+            except Exception as e:
+                failed.append(dim_table)
+                print(f"❌ ERROR: {dim_table}: {e}")
+    if failed:
+        # Facts would violate their foreign keys; the planned chunks stay PENDING
+        raise RuntimeError(f"dimension load failed: {', '.join(failed)}")
+
+
+# --- STAGE: FACTS ---
+def load_chunk(connections, fact_table, lo, hi):
+    """
+    Worker task: loads one PK range and marks its chunk DONE in the same
+    transaction, so the chunk is either fully loaded and recorded or not
+    at all. Retries transient errors (deadlocks, Galera certification).
+    A retry first checks the chunk row: if the previous attempt's COMMIT
+    went through but its acknowledgement was lost, the chunk is DONE.
+    """
+    spec = FACT_LOADS[fact_table]
+    for attempt in range(1, ETL_CHUNK_RETRIES + 1):
+        conn = connections.get()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT status, rows_loaded FROM etl_chunk
+                    WHERE source_table = %s AND chunk_lo = %s
+                    FOR UPDATE
+                """, (spec['source_table'], lo))
+                chunk = cursor.fetchone()
+                if chunk is None or chunk['status'] == 'DONE':
+                    conn.commit()
+                    return (chunk['rows_loaded'] or 0) if chunk else 0
+                cursor.execute(spec['sql'], {'lo': lo, 'hi': hi})
+                rows = cursor.rowcount
+                cursor.execute("""
+                    UPDATE etl_chunk SET status = 'DONE', rows_loaded = %s, finished_at = NOW()
+                    WHERE source_table = %s AND chunk_lo = %s
+                """, (rows, spec['source_table'], lo))
+            conn.commit()
+            return rows
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                connections.reset()
+            if attempt == ETL_CHUNK_RETRIES:
+                raise
+            print(f"⚠️ {fact_table} [{lo}-{hi}] attempt {attempt} failed ({e}); retrying...")
+            time.sleep(attempt)
+
+
+def load_facts(connections, chunks, workers):
+    """Loads all chunks on one pool. Returns ({fact_table: rows}, failed chunks)."""
+    if not chunks:
+        print("Nothing new to load.")
+        return {}, []
+    print(f"{len(chunks)} chunks across {workers} workers")
+    loaded = {fact_table: 0 for fact_table in FACT_LOADS}
+    failed = []
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='etl-fact') as pool:
+        futures = {pool.submit(load_chunk, connections, *chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            fact_table, lo, hi = futures[future]
+            try:
+                loaded[fact_table] += future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"❌ ERROR: {fact_table} [{lo}-{hi}] gave up: {e}")
+
+    elapsed = time.perf_counter() - started_at
+    for fact_table, rows in loaded.items():
+        print(f"✅ {fact_table}: {rows:,} rows")
+    total = sum(loaded.values())
+    print(f"   {total:,} fact rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return loaded, failed
+
+
+# --- STAGE: WATERMARK ---
+def advance_watermarks(conn, loaded, bounds):
+    """
+    Moves each watermark to the end of the contiguous DONE prefix (a
+    PENDING chunk blocks everything above it), capped at the previous
+    run's MAX, and deletes those chunks; keys between the new watermark
+    and this run's MAX (stored as pending_hi) are re-planned next run.
+    """
+    with conn.cursor() as cursor:
+        for fact_table, spec in FACT_LOADS.items():
+            source_table = spec['source_table']
+            safe_hi, hi = bounds[fact_table]
+            cursor.execute("UPDATE etl_watermark SET pending_hi = GREATEST(pending_hi, %s) WHERE source_table = %s",
+                           (hi, source_table))
+            cursor.execute("""
+                SELECT MIN(chunk_lo) AS first_pending FROM etl_chunk
+                WHERE source_table = %s AND status = 'PENDING'
+            """, (source_table,))
+            first_pending = cursor.fetchone()['first_pending']
+            cursor.execute("""
+                SELECT MAX(chunk_hi) AS done_hi FROM etl_chunk
+                WHERE source_table = %s AND status = 'DONE' AND chunk_lo < COALESCE(%s, chunk_lo + 1)
+            """, (source_table, first_pending))
+            done_hi = cursor.fetchone()['done_hi']
+            if done_hi is None:
+                continue
+            watermark = min(done_hi, safe_hi)
+            cursor.execute("""
+                UPDATE etl_watermark
+                SET last_id = GREATEST(last_id, %s), last_run_at = NOW(), rows_loaded = %s
+                WHERE source_table = %s
+            """, (watermark, loaded.get(fact_table, 0), source_table))
+            cursor.execute("DELETE FROM etl_chunk WHERE source_table = %s AND chunk_hi <= %s",
+                           (source_table, done_hi))
+            print(f"✅ {source_table} watermark -> {watermark}"
+                  + (f" (loaded through {done_hi}; the rest is re-checked next run)" if watermark < done_hi else "")
+                  + (f" (PENDING from {first_pending})" if first_pending is not None else ""))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel, chunked ETL into aethermart_dw.")
+    parser.add_argument('--full', action='store_true', help="truncate the DW and reload everything")
+    parser.add_argument('--workers', type=int, default=ETL_WORKERS, help="parallel DW connections")
+    parser.add_argument('--chunk-rows', type=int, default=ETL_CHUNK_ROWS, help="source PKs per fact chunk")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    try:
+        conn = open_dw()
+    except Exception as e:
+        print(f"❌ FATAL: Error connecting to MariaDB: {e}")
+        sys.exit(1)
+
+    timer = StageTimer()
+    connections = WorkerConnections()
+    failed = []
+    try:
+        if args.full:
+            timer.run("reset", reset_warehouse, conn)
+        chunks, bounds = timer.run("plan", plan_chunks, conn, max(1, args.chunk_rows))
+        timer.run("dimensions", load_dimensions, connections, workers)
+        loaded, failed = timer.run("facts", load_facts, connections, chunks, workers)
+        timer.run("watermark", advance_watermarks, conn, loaded, bounds)
+    except Exception as e:
+        print(f"❌ ETL aborted: {e}")
+        failed = failed or [e]
+    finally:
+        connections.close_all()
+        conn.close()
+        timer.report()
+
+    if failed:
+        print(f"\n❌ {len(failed)} failures; re-run to resume the PENDING chunks.")
+        sys.exit(1)
+    print("\n✅ AetherMart Data Warehouse ETL process complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+AetherMart In-Process ANN Search Backend
+Loads product / review / customer vectors from MariaDB once into a
+NumPy-backed IVF (inverted file) index, answers top-k in-process and
+then hydrates the winning rows by primary key from MariaDB.
+
+ - Cosine similarity on L2-normalized float32 vectors.
+ - Spherical k-means coarse quantizer; nprobe lists are scanned per query.
+ - Filtered search (e.g. rating IN (4, 5)) is applied inside the index and
+   widens nprobe until k matches are found, so a selective filter can
+   never starve the result list the way a post-filtered vector scan can.
+
+Select it in the search CLI with SEARCH_BACKEND=ann.
+
+Benchmark recall@k / QPS against the SQL path:
+    python3 Milestone4_task3_ann_index.py --table Products --queries 200 --k 5
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+ANN_NPROBE = int(os.environ.get('ANN_NPROBE', 8))
+ANN_KMEANS_ITERATIONS = 10
+ANN_SEED = 42
+
+# Everything the backend needs to know per searchable table.
+ANN_TABLES = {
+    'Products': {
+        'id_column': 'product_id',
+        'vector_column': 'product_embedding',
+        'attributes': [],
+        'hydrate_columns': ['product_id', 'product_name', 'product_description'],
+    },
+    'Reviews': {
+        'id_column': 'review_id',
+        'vector_column': 'review_embedding',
+        'attributes': ['rating'],
+        'hydrate_columns': ['review_id', 'review_text', 'rating'],
+    },
+    'Customers': {
+        'id_column': 'customer_id',
+        'vector_column': 'customer_embedding',
+        'attributes': [],
+        'hydrate_columns': ['customer_id', 'first_name', 'last_name', 'city', 'state'],
+    },
+}
+# =====================================================================
+
+
+def normalize_rows(matrix):
+    """L2-normalizes every row so a dot product equals cosine similarity."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def vectors_from_buffers(buffers, dimension=None):
+    """Stacks binary VECTOR column values (little-endian float32) into a matrix."""
+    if not buffers:
+        return np.zeros((0, dimension or 0), dtype=np.float32)
+    flat = np.frombuffer(b''.join(buffers), dtype='<f4')
+    return flat.reshape(len(buffers), -1).astype(np.float32, copy=False)
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class IVFIndex:
+    """Inverted-file index over normalized vectors (cosine similarity)."""
+
+    def __init__(self, ids, vectors, attributes=None, nlist=None,
+                 iterations=ANN_KMEANS_ITERATIONS, seed=ANN_SEED):
+        vectors = normalize_rows(vectors)
+        self.ids = np.asarray(ids)
+        self.attributes = {name: np.asarray(values) for name, values in (attributes or {}).items()}
+        n = len(vectors)
+        self.nlist = max(1, min(n, nlist or int(np.sqrt(n)) or 1))
+
+        self.centroids = self._train(vectors, iterations, seed)
+        assignments = self._assign(vectors)
+
+        # Store vectors grouped by list so every probed list is one contiguous slice
+        order = np.argsort(assignments, kind='stable')
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.ids = self.ids[order]
+        self.attributes = {name: values[order] for name, values in self.attributes.items()}
+        counts = np.bincount(assignments, minlength=self.nlist)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _train(self, vectors, iterations, seed):
+        if len(vectors) == 0:
+            return np.zeros((1, vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(self.nlist):
+                members = vectors[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+                else:
+                    centroids[c] = vectors[rng.integers(len(vectors))]  # re-seed empty list
+            centroids = normalize_rows(centroids)
+        return centroids
+
+    def _assign(self, vectors, chunk=65536):
+        if len(vectors) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([
+            np.argmax(vectors[i:i + chunk] @ self.centroids.T, axis=1)
+            for i in range(0, len(vectors), chunk)
+        ])
+
+    def search(self, query, k, nprobe=ANN_NPROBE, allowed=None):
+        """
+        Returns (ids, cosine distances) of the approximate top-k.
+        `allowed` is an optional boolean mask over the stored rows.
+        """
+        if len(self) == 0:
+            return self.ids[:0], np.zeros(0, dtype=np.float32)
+        query = normalize_rows(query)
+        list_order = np.argsort(-(self.centroids @ query))
+        nprobe = max(1, min(nprobe, self.nlist))
+
+        while True:
+            rows = np.concatenate([
+                np.arange(self.offsets[c], self.offsets[c + 1]) for c in list_order[:nprobe]
+            ])
+            if allowed is not None:
+                rows = rows[allowed[rows]]
+            if len(rows) >= k or nprobe >= self.nlist:
+                break
+            nprobe = min(self.nlist, nprobe * 2)  # filter too selective: widen the probe
+
+        scores = self.vectors[rows] @ query
+        best = top_k(scores, k)
+        return self.ids[rows[best]], 1.0 - scores[best]
+
+    def mask(self, attribute, values):
+        """Boolean mask of rows whose attribute is in values."""
+        return np.isin(self.attributes[attribute], list(values))
+
+
+def load_index(connection, table, nlist=None):
+    """Reads every non-NULL vector of the table and builds an IVFIndex."""
+    spec = ANN_TABLES[table]
+    columns = [spec['id_column'], spec['vector_column']] + spec['attributes']
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {', '.join(columns)}
+            FROM {table}
+            WHERE {spec['vector_column']} IS NOT NULL
+        """)
+        rows = cursor.fetchall()
+    ids = [row[spec['id_column']] for row in rows]
+    vectors = vectors_from_buffers([row[spec['vector_column']] for row in rows])
+    attributes = {name: [row[name] for row in rows] for name in spec['attributes']}
+    return IVFIndex(ids, vectors, attributes=attributes, nlist=nlist)
+
+
+def hydrate_rows(connection, table, ids, distances):
+    """Fetches full rows by primary key, in ANN order, with a 'distance' field."""
+    if len(ids) == 0:
+        return []
+    spec = ANN_TABLES[table]
+    id_list = [int(i) for i in ids]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {', '.join(spec['hydrate_columns'])}
+            FROM {table}
+            WHERE {spec['id_column']} IN ({', '.join(['%s'] * len(id_list))})
+        """, tuple(id_list))
+        by_id = {row[spec['id_column']]: row for row in cursor.fetchall()}
+    results = []
+    for row_id, distance in zip(id_list, distances):
+        row = by_id.get(row_id)
+        if row is not None:  # deleted since the index was loaded
+            results.append(dict(row, distance=float(distance)))
+    return results
+
+
+class AnnSearchBackend:
+    """
+    Search backend with the same methods as SqlSearchBackend in the search
+    interface. Indexes are built lazily on first use of each table.
+    """
+
+    name = 'ann'
+
+    def __init__(self, nprobe=ANN_NPROBE, nlist=None):
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.indexes = {}
+        self.lock = threading.Lock()  # concurrent first searches build the index once
+
+    def index(self, connection, table):
+        with self.lock:
+            if table not in self.indexes:
+                started_at = time.perf_counter()
+                self.indexes[table] = load_index(connection, table, nlist=self.nlist)
+                elapsed = time.perf_counter() - started_at
+                print(f"🧠 Built ANN index for {table}: {len(self.indexes[table])} vectors "
+                      f"in {self.indexes[table].nlist} lists ({elapsed:.2f}s)")
+            return self.indexes[table]
+
+    def _search(self, connection, table, query_vector, limit, allowed=None):
+        index = self.index(connection, table)
+        ids, distances = index.search(np.asarray(query_vector, dtype=np.float32), limit,
+                                      nprobe=self.nprobe, allowed=allowed)
+        return hydrate_rows(connection, table, ids, distances)
+
+    def products(self, connection, query_vector, limit):
+        print("🔍 Searching ANN index for similar PRODUCTS...")
+        return self._search(connection, 'Products', query_vector, limit)
+
+    def reviews(self, connection, query_vector, rating_filters, limit):
+        print("🔍 Searching ANN index for similar REVIEWS...")
+        index = self.index(connection, 'Reviews')
+        allowed = index.mask('rating', rating_filters) if rating_filters else None
+        return self._search(connection, 'Reviews', query_vector, limit, allowed=allowed)
+
+    def customers(self, connection, query_vector, limit):
+        print("🔍 Searching ANN index for 'lookalike' CUSTOMERS...")
+        return self._search(connection, 'Customers', query_vector, limit)
+
+
+# =====================================================================
+# BENCHMARK
+# =====================================================================
+
+def exact_top_k(vectors, ids, query, k, allowed=None):
+    scores = normalize_rows(vectors) @ normalize_rows(query)
+    if allowed is not None:
+        scores = np.where(allowed, scores, -np.inf)
+    best = top_k(scores, k)
+    return ids[best[np.isfinite(scores[best])]]
+
+
+def recall_at_k(found, expected):
+    expected = set(int(i) for i in expected)
+    return len(expected & set(int(i) for i in found)) / len(expected) if expected else 1.0
+
+
+def main():
+    import argparse
+    import pymysql
+    from Milestone4_task3_semantic_search_interface import DB_CONFIG, SqlSearchBackend
+
+    parser = argparse.ArgumentParser(description="Recall@k / QPS: in-process ANN vs MariaDB SQL path.")
+    parser.add_argument('--table', choices=sorted(ANN_TABLES), default='Products')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--nprobe', type=int, default=ANN_NPROBE)
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--noise', type=float, default=0.05, help="perturbation applied to sampled query vectors")
+    parser.add_argument('--rating', type=int, nargs='*', default=None, help="Reviews only: rating filter")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"       AetherMart ANN Benchmark ({args.table})")
+    print("=" * 70)
+
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        started_at = time.perf_counter()
+        index = load_index(connection, args.table, nlist=args.nlist)
+        print(f"🧠 Index: {len(index)} vectors, {index.nlist} lists, built in {time.perf_counter() - started_at:.2f}s")
+        if len(index) == 0:
+            print("⚠️  No vectors to benchmark.")
+            return
+
+        rng = np.random.default_rng(ANN_SEED)
+        picks = rng.choice(len(index), min(args.queries, len(index)), replace=False)
+        queries = index.vectors[picks] + rng.normal(0, args.noise, (len(picks), index.vectors.shape[1]))
+        queries = queries.astype(np.float32)
+        allowed = index.mask('rating', args.rating) if args.rating else None
+
+        # --- ANN path (index only; hydration is one PK lookup in both designs) ---
+        recalls = []
+        started_at = time.perf_counter()
+        ann_results = [index.search(q, args.k, nprobe=args.nprobe, allowed=allowed)[0] for q in queries]
+        ann_qps = len(queries) / (time.perf_counter() - started_at)
+        for q, found in zip(queries, ann_results):
+            recalls.append(recall_at_k(found, exact_top_k(index.vectors, index.ids, q, args.k, allowed)))
+
+        # --- SQL path ---
+        sql_backend = SqlSearchBackend()
+        sql_recalls = []
+        spec = ANN_TABLES[args.table]
+        started_at = time.perf_counter()
+        for q in queries:
+            if args.table == 'Products':
+                rows = sql_backend.products(connection, q.tolist(), args.k)
+            elif args.table == 'Reviews':
+                rows = sql_backend.reviews(connection, q.tolist(), args.rating or [], args.k)
+            else:
+                rows = sql_backend.customers(connection, q.tolist(), args.k)
+            sql_recalls.append(recall_at_k([r[spec['id_column']] for r in rows],
+                                           exact_top_k(index.vectors, index.ids, q, args.k, allowed)))
+        sql_qps = len(queries) / (time.perf_counter() - started_at)
+
+        print(f"\n📊 {len(queries)} queries, k={args.k}, nprobe={args.nprobe}")
+        print(f"   • ANN (in-process): recall@{args.k} = {np.mean(recalls):.3f}   {ann_qps:>9.1f} QPS")
+        print(f"   • SQL (MariaDB)   : recall@{args.k} = {np.mean(sql_recalls):.3f}   {sql_qps:>9.1f} QPS")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
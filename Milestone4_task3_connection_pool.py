@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+AetherMart MariaDB Connection Pool
+Long-lived, thread-safe pool of pymysql connections shared by the
+semantic search tools. Idle connections are health-checked with
+ping(reconnect=True) before they are handed out, and a connection that
+raised a connection-level error is discarded instead of being reused.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 8
+POOL_HEALTH_CHECK_INTERVAL = 30  # seconds a connection may sit idle before it is pinged
+POOL_ACQUIRE_TIMEOUT = 10        # seconds to wait for a free connection
+# =====================================================================
+
+# Errors that mean the connection itself is unusable
+CONNECTION_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+
+class ConnectionPool:
+    """Keeps up to max_size open connections and hands them out on demand."""
+
+    def __init__(self, db_config, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 health_check_interval=POOL_HEALTH_CHECK_INTERVAL,
+                 acquire_timeout=POOL_ACQUIRE_TIMEOUT):
+        self.db_config = dict(db_config)
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.idle = queue.LifoQueue()   # (connection, last_used_at); LIFO keeps hot connections hot
+        self.lock = threading.Lock()
+        self.size = 0
+        self.closed = False
+        for _ in range(min_size):
+            self.idle.put((self._open(), time.monotonic()))
+
+    def _open(self):
+        with self.lock:
+            self.size += 1
+        try:
+            return pymysql.connect(**self.db_config)
+        except Exception:
+            with self.lock:
+                self.size -= 1
+            raise
+
+    def _discard(self, connection):
+        with self.lock:
+            self.size -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _healthy(self, connection, last_used_at):
+        if not connection.open:
+            return False
+        if time.monotonic() - last_used_at < self.health_check_interval:
+            return True
+        try:
+            connection.ping(reconnect=True)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Returns a healthy connection, opening a new one if the pool has room."""
+        if self.closed:
+            raise RuntimeError("connection pool is closed")
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            try:
+                connection, last_used_at = self.idle.get_nowait()
+            except queue.Empty:
+                with self.lock:
+                    has_room = self.size < self.max_size
+                if has_room:
+                    return self._open()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no free connection after {self.acquire_timeout}s")
+                try:
+                    connection, last_used_at = self.idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+            if self._healthy(connection, last_used_at):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection, broken=False):
+        """Returns a connection to the pool (or drops it if it is broken)."""
+        if broken or self.closed or not connection.open:
+            self._discard(connection)
+            return
+        try:
+            connection.rollback()  # never hand out a connection mid-transaction
+        except Exception:
+            self._discard(connection)
+            return
+        self.idle.put((connection, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... -- released (or discarded) afterwards."""
+        connection = self.acquire()
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            self.release(connection, broken=True)
+            raise
+        except Exception:
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                connection, _ = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
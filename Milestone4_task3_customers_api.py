@@ -7,11 +7,12 @@ RUN THIS SCRIPT FIRST.
 """
 
 import pymysql
-import google.generativeai as genai
-import time
 import sys
 import os
 
+from Milestone4_task3_embedding_engine import build_engine
+from Milestone4_task3_vector_loader import load_vectors
+
 # =====================================================================
 # CONFIGURATION
 # =====================================================================
@@ -72,6 +73,7 @@ def prepare_customers_table(connection):
                 print("ℹ️  'Customers' table is not partitioned. Good to go.")
 
             # --- STEP 2: REDO THE COLUMN (Starts fresh) ---
+            # Cheap to redo: unchanged profiles come back from the embedding cache.
             print("🔄 Starting fresh: Dropping old index and column...")
             cursor.execute("DROP INDEX IF EXISTS idx_customer_embedding ON Customers")
             cursor.execute("ALTER TABLE Customers DROP COLUMN IF EXISTS customer_embedding")
@@ -134,48 +136,37 @@ def fetch_customer_profiles(connection):
         print(f"❌ Error fetching customer profiles: {e}")
         raise
 
+def build_customer_profile(customer):
+    """FEATURE ENGINEERING (The "Lookalike" String)"""
+    profile = f"Customer {customer['first_name']} from {customer['city']}, {customer['state']}."
+    
+    if customer['purchase_categories']:
+        profile += f" This customer primarily buys: {customer['purchase_categories']}."
+    else:
+        profile += " This customer has no purchase history."
+    
+    return profile
+
 def generate_embeddings_gemini(customers):
     """Generate embeddings using Google Gemini API"""
     print(f"\n🔄 Initializing Google Gemini API...")
-    genai.configure(api_key=API_KEY)
-    print(f"🔄 Generating embeddings using {MODEL_NAME}...")
+    engine = build_engine(API_KEY, MODEL_NAME, dimension=EMBEDDING_DIMENSION)
+    print(f"🔄 Generating embeddings using {engine.model_name}...")
     
     embeddings_data = []
     failed_customers = []
     
-    for i, customer in enumerate(customers, 1):
-        
-        # --- FEATURE ENGINEERING (The "Lookalike" String) ---
-        profile = f"Customer {customer['first_name']} from {customer['city']}, {customer['state']}."
-        
-        if customer['purchase_categories']:
-            profile += f" This customer primarily buys: {customer['purchase_categories']}."
-        else:
-            profile += " This customer has no purchase history."
-        
-        text_to_embed = profile
-        
-        try:
-            result = genai.embed_content(
-                model=MODEL_NAME,
-                content=text_to_embed,
-                task_type="retrieval_document" # Store this vector
-            )
-            
-            embeddings_data.append({
-                'customer_id': customer['customer_id'],
-                'embedding': result['embedding']
-            })
-            
-            if i % 10 == 0 or i == len(customers):
-                print(f"   Progress: {i}/{len(customers)} customers embedded")
-            
-            time.sleep(1.1) # Rate limiting
-                
-        except Exception as e:
-            print(f"⚠️  Error embedding customer {customer['customer_id']}: {e}")
+    texts_to_embed = [build_customer_profile(customer) for customer in customers]
+    embeddings = engine.embed(texts_to_embed, task_type="retrieval_document", label="customers") # Store these vectors
+    
+    for customer, embedding in zip(customers, embeddings):
+        if embedding is None:
             failed_customers.append(customer['customer_id'])
-            time.sleep(2)
+            continue
+        embeddings_data.append({
+            'customer_id': customer['customer_id'],
+            'embedding': embedding
+        })
     
     print(f"\n✅ Generated embeddings for {len(embeddings_data)} customers")
     if failed_customers:
@@ -183,32 +174,16 @@ def generate_embeddings_gemini(customers):
     
     return embeddings_data
 
-def vector_to_string(vector):
-    """Convert vector list to MariaDB VECTOR format string"""
-    return '[' + ','.join([f"{v:.8f}" for v in vector]) + ']'
-
 def load_embeddings_to_db(connection, embeddings_data):
-    """Load embeddings into MariaDB"""
+    """Load embeddings into MariaDB (binary float32 VECTOR values, batched)"""
     print("\n🔄 Loading embeddings into database...")
     
     try:
-        with connection.cursor() as cursor:
-            update_count = 0
-            for data in embeddings_data:
-                sql = """
-                    UPDATE Customers 
-                    SET customer_embedding = VEC_FromText(%s)
-                    WHERE customer_id = %s
-                """
-                cursor.execute(sql, (vector_to_string(data['embedding']), data['customer_id']))
-                update_count += 1
-                
-                if update_count % 10 == 0 or update_count == len(embeddings_data):
-                    connection.commit()
-                    print(f"   Progress: {update_count}/{len(embeddings_data)} customers updated")
-            
-            connection.commit()
-            print(f"\n✅ Successfully loaded embeddings for {update_count} customers!")
+        update_count, errors = load_vectors(connection, 'Customers', embeddings_data, id_key='customer_id')
+        print(f"\n✅ Successfully loaded embeddings for {update_count} customers!")
+        
+        if errors:
+            print(f"⚠️  Errors occurred for customers: {errors}")
             
     except Exception as e:
         connection.rollback()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+AetherMart Query Embedding Micro-Batcher
+Coalesces query embeddings from concurrent search requests into a single
+batch embedding call. The first query that misses the cache opens a
+window of EMBED_BATCH_WINDOW_MS; every query arriving during that window
+(up to EMBED_BATCH_MAX_SIZE) joins the batch, which is then embedded with
+one API round trip and fanned back out to the waiting requests.
+Identical queries in a window share one slot in the batch.
+
+Used by Milestone4_task3_search_service.py. Batch-size and wait-time
+histograms are exposed on /health.
+
+Offline demo (fake embedder with 80ms round trips):
+    python3 Milestone4_task3_embedding_batcher.py --requests 500 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import bisect
+import os
+import random
+import time
+
+from Milestone4_task3_embedding_cache import normalize_query
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+EMBED_BATCH_WINDOW_MS = float(os.environ.get('EMBED_BATCH_WINDOW_MS', 10))   # 0 = no batching
+EMBED_BATCH_MAX_SIZE = int(os.environ.get('EMBED_BATCH_MAX_SIZE', 100))     # API limit per call
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 100]
+WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+# =====================================================================
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style: le=bound)."""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'mean': round(self.sum / self.count, 3) if self.count else 0.0,
+            'buckets': buckets,
+        }
+
+
+class EmbeddingBatcher:
+    """
+    asyncio request coalescer. embed_many(queries, task_type) is a
+    blocking function embedding a list in one call; run_blocking(func,
+    *args) runs it off the event loop (e.g. SearchService.run_blocking).
+    """
+
+    def __init__(self, embed_many, run_blocking, window_ms=EMBED_BATCH_WINDOW_MS,
+                 max_size=EMBED_BATCH_MAX_SIZE):
+        self.embed_many = embed_many
+        self.run_blocking = run_blocking
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.pending = {}   # task_type -> {normalized query: (query, future, enqueued_at)}
+        self.timers = {}    # task_type -> TimerHandle of the open window
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.requests = 0
+        self.api_calls = 0
+        self.failed_batches = 0
+
+    async def embed(self, search_query, task_type):
+        """Embedding for one query; raises if its batch failed."""
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        batch = self.pending.setdefault(task_type, {})
+        key = normalize_query(search_query)
+        if key in batch:
+            return await asyncio.shield(batch[key][1])
+
+        future = loop.create_future()
+        batch[key] = (search_query, future, time.perf_counter())
+        if len(batch) >= self.max_size:
+            self._flush(task_type)
+        elif task_type not in self.timers:
+            self.timers[task_type] = loop.call_later(self.window, self._flush, task_type)
+        # shield: a caller timing out must not cancel the result for the others
+        return await asyncio.shield(future)
+
+    def _flush(self, task_type):
+        timer = self.timers.pop(task_type, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(task_type, None)
+        if batch:
+            asyncio.ensure_future(self._embed_batch(task_type, list(batch.values())))
+
+    async def _embed_batch(self, task_type, entries):
+        started_at = time.perf_counter()
+        for _, _, enqueued_at in entries:
+            self.wait_ms.observe((started_at - enqueued_at) * 1000)
+        self.batch_sizes.observe(len(entries))
+        self.api_calls += 1
+
+        try:
+            vectors = await self.run_blocking(self.embed_many, [query for query, _, _ in entries], task_type)
+            if vectors is None or len(vectors) != len(entries):
+                # zip() would leave the unmatched callers waiting forever
+                raise RuntimeError(f"embedding batch returned {0 if vectors is None else len(vectors)} "
+                                   f"vectors for {len(entries)} queries")
+        except Exception as e:
+            self.failed_batches += 1
+            for _, future, _ in entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), vector in zip(entries, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_size': self.max_size,
+            'requests': self.requests,
+            'api_calls': self.api_calls,
+            'failed_batches': self.failed_batches,
+            'requests_per_call': round(self.requests / self.api_calls, 2) if self.api_calls else 0.0,
+            'batch_size': self.batch_sizes.snapshot(),
+            'wait_ms': self.wait_ms.snapshot(),
+        }
+
+
+# =====================================================================
+# OFFLINE DEMO
+# =====================================================================
+
+def main():
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Micro-batching demo with a fake embedder.")
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.08, help="seconds per fake API call")
+    parser.add_argument('--window-ms', type=float, default=EMBED_BATCH_WINDOW_MS)
+    parser.add_argument('--max-size', type=int, default=EMBED_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    def fake_embed_many(queries, task_type):
+        time.sleep(args.latency)
+        return [[float(len(q))] for q in queries]
+
+    async def run():
+        executor = ThreadPoolExecutor(max_workers=16)
+        loop = asyncio.get_running_loop()
+        run_blocking = lambda func, *a: loop.run_in_executor(executor, func, *a)
+        batcher = EmbeddingBatcher(fake_embed_many, run_blocking, args.window_ms, args.max_size)
+        remaining = iter(range(args.requests))
+
+        async def client():
+            for i in remaining:
+                await batcher.embed(f"query {i} {random.random()}", "retrieval_query")
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(args.concurrency)])
+        executor.shutdown()
+        return batcher.stats(), time.perf_counter() - started_at
+
+    stats, elapsed = asyncio.run(run())
+    print(f"📊 {stats['requests']} queries -> {stats['api_calls']} API calls "
+          f"({stats['requests_per_call']} per call) in {elapsed:.2f}s")
+    print(f"   batch size: mean={stats['batch_size']['mean']}  buckets={stats['batch_size']['buckets']}")
+    print(f"   wait ms:    mean={stats['wait_ms']['mean']}  buckets={stats['wait_ms']['buckets']}")
+
+
+if __name__ == "__main__":
+    main()
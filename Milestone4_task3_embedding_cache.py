@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+AetherMart Embedding Cache
+Persistent SQLite cache of document embeddings, keyed by a SHA-256 hash
+of the model name, task type and the exact text that was embedded.
+A re-run of the generators only calls the embedding backend for rows
+whose text actually changed.
+
+Also provides QueryEmbeddingCache, the in-process LRU (with an optional
+on-disk tier) used by the semantic search engine for query vectors.
+
+Inspect the cache:
+    python3 Milestone4_task3_embedding_cache.py
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from Milestone4_task3_embedding_engine import pack_vector, unpack_vector
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+EMBED_CACHE_PATH = os.environ.get('EMBED_CACHE_PATH', 'embedding_cache.sqlite3')  # '' disables the cache
+SQLITE_MAX_VARIABLES = 900  # stay under SQLite's bound-parameter limit
+
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', 2048))
+QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL', 7 * 24 * 3600))   # seconds
+QUERY_CACHE_PATH = os.environ.get('QUERY_CACHE_PATH', '')                     # '' = memory only
+# =====================================================================
+
+
+def cache_key(text, model_name, task_type):
+    """Content hash of exactly what was sent to the backend."""
+    digest = hashlib.sha256()
+    for part in (model_name, task_type, text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding store with hit/miss counters."""
+
+    key = staticmethod(cache_key)
+
+    def __init__(self, path=EMBED_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                cache_key TEXT PRIMARY KEY,
+                model_name TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys, max_age=None):
+        """
+        Returns {key: vector} for every key present in the cache
+        (and, if max_age is given, stored less than max_age seconds ago).
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        min_created_at = time.time() - max_age if max_age is not None else 0
+        with self.lock:
+            for start in range(0, len(unique_keys), SQLITE_MAX_VARIABLES):
+                chunk = unique_keys[start:start + SQLITE_MAX_VARIABLES]
+                placeholders = ', '.join(['?'] * len(chunk))
+                rows = self.conn.execute(
+                    f"""
+                    SELECT cache_key, vector FROM embeddings
+                    WHERE cache_key IN ({placeholders}) AND created_at >= ?
+                    """,
+                    chunk + [min_created_at]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = unpack_vector(blob)
+        return found
+
+    def put_many(self, entries, model_name, task_type):
+        """Stores (key, vector) pairs; existing keys are overwritten."""
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO embeddings
+                    (cache_key, model_name, task_type, dimension, vector, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [(key, model_name, task_type, len(vector), pack_vector(vector), now)
+                 for key, vector in entries]
+            )
+            self.conn.commit()
+
+    def record(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def normalize_query(text):
+    """Case- and whitespace-insensitive form of a search query."""
+    return ' '.join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU of query vectors keyed by (normalized query, task_type).
+    Entries expire after ttl seconds; the least recently used entry is
+    evicted once max_entries is reached. An EmbeddingCache can be passed
+    as a second, on-disk tier that survives restarts.
+    """
+
+    def __init__(self, model_name, max_entries=QUERY_CACHE_MAX_ENTRIES,
+                 ttl=QUERY_CACHE_TTL, disk=None):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = disk
+        self.entries = OrderedDict()   # key -> (vector, stored_at)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _key(self, query, task_type):
+        return cache_key(normalize_query(query), self.model_name, task_type)
+
+    def _store(self, key, vector, stored_at):
+        self.entries[key] = (vector, stored_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, query, task_type):
+        key = self._key(query, task_type)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                vector, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self.entries[key]
+                self.expirations += 1
+
+        if self.disk is not None:
+            vector = self.disk.get_many([key], max_age=self.ttl).get(key)
+            if vector is not None:
+                with self.lock:
+                    self._store(key, vector, now)
+                    self.disk_hits += 1
+                return vector
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, query, task_type, vector):
+        key = self._key(query, task_type)
+        with self.lock:
+            self._store(key, vector, time.time())
+        if self.disk is not None:
+            self.disk.put_many([(key, vector)], self.model_name, task_type)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+def open_cache(path=EMBED_CACHE_PATH):
+    """Opens the configured cache, or returns None when it is disabled."""
+    if not path:
+        return None
+    return EmbeddingCache(path)
+
+
+def open_query_cache(model_name, path=QUERY_CACHE_PATH):
+    """Query cache for the search engine; disk tier only if QUERY_CACHE_PATH is set."""
+    return QueryEmbeddingCache(model_name, disk=open_cache(path))
+
+
+def main():
+    """Prints a summary of the cache contents."""
+    if not EMBED_CACHE_PATH or not os.path.exists(EMBED_CACHE_PATH):
+        print(f"ℹ️  No embedding cache found at '{EMBED_CACHE_PATH}'.")
+        return
+
+    cache = EmbeddingCache(EMBED_CACHE_PATH)
+    try:
+        print(f"📦 Embedding cache: {EMBED_CACHE_PATH}")
+        print(f"   Entries: {cache.count()}")
+        rows = cache.conn.execute("""
+            SELECT model_name, task_type, COUNT(*)
+            FROM embeddings
+            GROUP BY model_name, task_type
+            ORDER BY model_name, task_type
+        """)
+        for model_name, task_type, count in rows:
+            print(f"   • {model_name} / {task_type}: {count}")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+AetherMart Shared Embedding Engine
+Batched, concurrent embedding used by the product, customer and
+review generators (Milestone4_task3_*_api.py).
+
+ - Sends multi-document batch requests instead of one row per call.
+ - Keeps a configurable number of requests in flight.
+ - Paces requests with a token bucket instead of fixed sleeps.
+ - Retries failed batches with exponential backoff.
+ - Takes a pluggable backend (Gemini, or a local fake for offline benchmarks).
+ - Optionally skips unchanged texts via the persistent embedding cache
+   (Milestone4_task3_embedding_cache.py).
+
+Benchmark offline:
+    python3 Milestone4_task3_embedding_engine.py --rows 2000 --in-flight 8
+"""
+
+import hashlib
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# =====================================================================
+# CONFIGURATION (environment variables override the defaults)
+# =====================================================================
+EMBED_BACKEND = os.environ.get('EMBED_BACKEND', 'gemini')           # 'gemini' or 'fake'
+EMBED_BATCH_SIZE = int(os.environ.get('EMBED_BATCH_SIZE', 100))     # Gemini accepts up to 100 docs per batch
+EMBED_MAX_IN_FLIGHT = int(os.environ.get('EMBED_MAX_IN_FLIGHT', 4))
+EMBED_REQUESTS_PER_MINUTE = float(os.environ.get('EMBED_REQUESTS_PER_MINUTE', 60))
+EMBED_MAX_RETRIES = int(os.environ.get('EMBED_MAX_RETRIES', 5))
+EMBED_BACKOFF_BASE = 1.0   # seconds, doubled on every retry
+EMBED_BACKOFF_MAX = 30.0   # seconds
+# =====================================================================
+
+
+def pack_vector(vector):
+    """Packs a vector as a little-endian float32 buffer (MariaDB VECTOR layout)."""
+    packed = array('f', vector)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_vector(buffer):
+    """Inverse of pack_vector: little-endian float32 bytes -> list of floats."""
+    unpacked = array('f')
+    unpacked.frombytes(buffer)
+    if sys.byteorder != 'little':
+        unpacked.byteswap()
+    return unpacked.tolist()
+
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available."""
+
+    def __init__(self, rate_per_sec, capacity=None):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeminiBackend:
+    """Embeds a batch of documents with one Google Gemini API call."""
+
+    def __init__(self, api_key, model_name):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model_name = model_name
+
+    def embed_batch(self, texts, task_type):
+        result = self.genai.embed_content(
+            model=self.model_name,
+            content=list(texts),
+            task_type=task_type
+        )
+        return result['embedding']
+
+
+class FakeBackend:
+    """
+    Local stand-in for the Gemini API. Returns deterministic vectors
+    derived from the text hash after a simulated network latency, so
+    throughput can be benchmarked without quota or network access.
+    """
+
+    def __init__(self, dimension=768, latency=0.05, model_name="fake/embedding"):
+        self.dimension = dimension
+        self.latency = latency
+        self.model_name = model_name
+
+    def embed_batch(self, texts, task_type):
+        time.sleep(self.latency)
+        vectors = []
+        for text in texts:
+            seed = hashlib.sha256(f"{task_type}:{text}".encode('utf-8')).digest()
+            rng = random.Random(struct.unpack('<Q', seed[:8])[0])
+            vectors.append([rng.uniform(-1.0, 1.0) for _ in range(self.dimension)])
+        return vectors
+
+
+class EmbeddingEngine:
+    """Splits texts into batches and embeds them concurrently."""
+
+    def __init__(self, backend, batch_size=EMBED_BATCH_SIZE, max_in_flight=EMBED_MAX_IN_FLIGHT,
+                 requests_per_minute=EMBED_REQUESTS_PER_MINUTE, max_retries=EMBED_MAX_RETRIES,
+                 backoff_base=EMBED_BACKOFF_BASE, backoff_max=EMBED_BACKOFF_MAX, cache=None):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate_limiter = TokenBucket(requests_per_minute / 60.0, capacity=self.max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @property
+    def model_name(self):
+        return self.backend.model_name
+
+    def _embed_with_retry(self, texts, task_type):
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                vectors = self.backend.embed_batch(texts, task_type)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"backend returned {len(vectors)} vectors for {len(texts)} texts")
+                return vectors
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                delay *= random.uniform(0.5, 1.0)  # jitter so concurrent retries don't line up
+                print(f"⚠️  Embedding batch failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed(self, texts, task_type="retrieval_document", label="rows"):
+        """
+        Embeds every text and returns a list aligned with the input.
+        Entries whose batch failed after all retries are None.
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        if not texts:
+            return results
+
+        pending = list(range(len(texts)))
+        if self.cache is not None:
+            keys = [self.cache.key(text, self.model_name, task_type) for text in texts]
+            cached = self.cache.get_many(keys)
+            pending = [i for i, key in enumerate(keys) if key not in cached]
+            for i, key in enumerate(keys):
+                if key in cached:
+                    results[i] = cached[key]
+            hits = len(texts) - len(pending)
+            self.cache.record(hits, len(pending))
+            print(f"📦 Cache: {hits}/{len(texts)} {label} unchanged "
+                  f"({hits / len(texts):.1%} hit ratio), {len(pending)} to embed")
+
+        embedded = self._embed_uncached([texts[i] for i in pending], task_type, label)
+        for i, vector in zip(pending, embedded):
+            results[i] = vector
+
+        if self.cache is not None:
+            self.cache.put_many(
+                [(keys[i], vector) for i, vector in zip(pending, embedded) if vector is not None],
+                self.model_name, task_type
+            )
+
+        return results
+
+    def _embed_uncached(self, texts, task_type, label):
+        results = [None] * len(texts)
+        if not texts:
+            return results
+
+        batches = [(start, texts[start:start + self.batch_size])
+                   for start in range(0, len(texts), self.batch_size)]
+        done = 0
+        started_at = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = {
+                executor.submit(self._embed_with_retry, batch, task_type): (start, len(batch))
+                for start, batch in batches
+            }
+            for future in as_completed(futures):
+                start, size = futures[future]
+                try:
+                    results[start:start + size] = future.result()
+                except Exception as e:
+                    print(f"⚠️  Giving up on {label} {start + 1}-{start + size}: {e}")
+                done += size
+                elapsed = time.monotonic() - started_at
+                rate = done / elapsed if elapsed > 0 else 0.0
+                print(f"   Progress: {done}/{len(texts)} {label} embedded ({rate:.1f} {label}/sec)")
+
+        return results
+
+
+def build_engine(api_key, model_name, backend=None, dimension=768, use_cache=True):
+    """
+    Creates the engine for the generators; EMBED_BACKEND=fake runs offline.
+    The persistent cache is attached unless EMBED_CACHE_PATH is empty.
+    """
+    from Milestone4_task3_embedding_cache import open_cache
+
+    if backend is None:
+        if EMBED_BACKEND == 'fake':
+            backend = FakeBackend(dimension=dimension)
+        else:
+            backend = GeminiBackend(api_key, model_name)
+    cache = open_cache() if use_cache else None
+    return EmbeddingEngine(backend, cache=cache)
+
+
+def main():
+    """Offline throughput benchmark against the fake backend."""
+    import argparse
+    from Milestone4_task3_embedding_cache import open_cache
+
+    parser = argparse.ArgumentParser(description="Benchmark the embedding engine offline.")
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument('--in-flight', type=int, default=EMBED_MAX_IN_FLIGHT)
+    parser.add_argument('--rpm', type=float, default=6000, help="requests per minute")
+    parser.add_argument('--latency', type=float, default=0.2, help="simulated seconds per request")
+    parser.add_argument('--dimension', type=int, default=768)
+    parser.add_argument('--cache', default='', help="embedding cache path (re-run to measure an incremental pass)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("       AetherMart Embedding Engine Benchmark (fake backend)")
+    print("=" * 70)
+
+    texts = [f"Product: Item {i}. Description: benchmark row {i}" for i in range(args.rows)]
+    engine = EmbeddingEngine(
+        FakeBackend(dimension=args.dimension, latency=args.latency),
+        batch_size=args.batch_size,
+        max_in_flight=args.in_flight,
+        requests_per_minute=args.rpm,
+        cache=open_cache(args.cache)
+    )
+
+    started_at = time.monotonic()
+    vectors = engine.embed(texts)
+    elapsed = time.monotonic() - started_at
+
+    embedded = sum(1 for v in vectors if v is not None)
+    legacy_seconds = args.rows * (args.latency + 1.1)  # one call + time.sleep(1.1) per row
+    print(f"\n✅ Embedded {embedded}/{args.rows} rows in {elapsed:.2f}s ({embedded / elapsed:.1f} rows/sec)")
+    print(f"📊 Legacy one-row-per-call path would take ~{legacy_seconds:.0f}s "
+          f"({args.rows / legacy_seconds:.2f} rows/sec)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,11 @@ Generates embeddings and loads them into MariaDB
 """
 
 import pymysql
-import google.generativeai as genai
-import time
 import sys
 
+from Milestone4_task3_embedding_engine import build_engine
+from Milestone4_task3_vector_loader import load_vectors
+
 # =====================================================================
 # CONFIGURATION - EDIT THESE VALUES
 # =====================================================================
@@ -72,6 +73,7 @@ def add_vector_column(connection):
             else:
                 print("ℹ️  product_embedding column already exists")
                 # Optionally, clear existing embeddings
+                # (unchanged products are still served from the embedding cache)
                 response = input("Clear existing embeddings? (y/n): ")
                 if response.lower() == 'y':
                     cursor.execute("UPDATE Products SET product_embedding = NULL")
@@ -115,48 +117,35 @@ def generate_embeddings_gemini(products):
         print("   Get it from: https://aistudio.google.com/app/apikey")
         sys.exit(1)
     
-    genai.configure(api_key=API_KEY)
+    engine = build_engine(API_KEY, MODEL_NAME, dimension=EMBEDDING_DIMENSION)
     
-    print(f"🔄 Generating embeddings using {MODEL_NAME}...")
+    print(f"🔄 Generating embeddings using {engine.model_name}...")
     embeddings_data = []
     failed_products = []
     
-    for i, product in enumerate(products, 1):
-        # Combine product information for richer embedding
-        text_to_embed = (
+    # Combine product information for richer embedding
+    texts_to_embed = [
+        (
             f"Product: {product['product_name']}. "
             f"Description: {product['product_description']} "
             f"Category: {product['category_name']}. "
             f"Price: ${product['price']}"
         )
-        
-        try:
-            # Generate embedding using Gemini
-            result = genai.embed_content(
-                model=MODEL_NAME,
-                content=text_to_embed,
-                task_type="retrieval_document"
-            )
-            
-            embedding = result['embedding']
-            
-            embeddings_data.append({
-                'product_id': product['product_id'],
-                'product_name': product['product_name'],
-                'embedding': embedding
-            })
-            
-            if i % 10 == 0:
-                print(f"   Progress: {i}/{len(products)} products embedded")
-            
-            # Rate limiting: Gemini free tier = 60 requests/minute
-            # Sleep for 1 second every request to be safe (60 req/min = 1 req/sec)
-            time.sleep(1.1)
-                
-        except Exception as e:
-            print(f"⚠️  Error embedding product {product['product_id']}: {e}")
+        for product in products
+    ]
+    
+    # Batched + concurrent; rate limiting and retries live in the engine
+    embeddings = engine.embed(texts_to_embed, task_type="retrieval_document", label="products")
+    
+    for product, embedding in zip(products, embeddings):
+        if embedding is None:
             failed_products.append(product['product_id'])
-            time.sleep(2)  # Extra delay after error
+            continue
+        embeddings_data.append({
+            'product_id': product['product_id'],
+            'product_name': product['product_name'],
+            'embedding': embedding
+        })
     
     print(f"\n✅ Generated embeddings for {len(embeddings_data)} products")
     if failed_products:
@@ -164,48 +153,16 @@ def generate_embeddings_gemini(products):
     
     return embeddings_data
 
-def vector_to_string(vector):
-    """Convert vector list to MariaDB VECTOR format string"""
-    vector_str = '[' + ','.join([f"{v:.8f}" for v in vector]) + ']'
-    return vector_str
-
 def load_embeddings_to_db(connection, embeddings_data):
-    """Load embeddings into MariaDB"""
+    """Load embeddings into MariaDB (binary float32 VECTOR values, batched)"""
     print("\n🔄 Loading embeddings into database...")
     
     try:
-        with connection.cursor() as cursor:
-            update_count = 0
-            errors = []
-            
-            for data in embeddings_data:
-                product_id = data['product_id']
-                embedding_vector = vector_to_string(data['embedding'])
-                
-                try:
-                    # Update product with embedding
-                    sql = """
-                        UPDATE Products 
-                        SET product_embedding = VEC_FromText(%s)
-                        WHERE product_id = %s
-                    """
-                    cursor.execute(sql, (embedding_vector, product_id))
-                    update_count += 1
-                    
-                    if update_count % 10 == 0:
-                        connection.commit()
-                        print(f"   Progress: {update_count}/{len(embeddings_data)} products updated")
-                        
-                except Exception as e:
-                    print(f"⚠️  Error updating product {product_id}: {e}")
-                    errors.append(product_id)
-            
-            # Final commit
-            connection.commit()
-            print(f"\n✅ Successfully loaded embeddings for {update_count} products!")
-            
-            if errors:
-                print(f"⚠️  Errors occurred for products: {errors}")
+        update_count, errors = load_vectors(connection, 'Products', embeddings_data, id_key='product_id')
+        print(f"\n✅ Successfully loaded embeddings for {update_count} products!")
+        
+        if errors:
+            print(f"⚠️  Errors occurred for products: {errors}")
             
     except Exception as e:
         connection.rollback()
@@ -306,7 +263,6 @@ def main():
             print("   Please run the product description UPDATE statements first!")
             return
         
-        print(f"\n⏱️  Estimated time: ~{len(products)} seconds (rate limited)")
         response = input("\nProceed with embedding generation? (y/n): ")
         
         if response.lower() != 'y':
@@ -5,11 +5,12 @@ Generates embeddings for all reviews and loads them into MariaDB.
 """
 
 import pymysql
-import google.generativeai as genai
-import time
 import sys
 import os
 
+from Milestone4_task3_embedding_engine import build_engine
+from Milestone4_task3_vector_loader import load_vectors
+
 # =====================================================================
 # CONFIGURATION - EDIT THESE VALUES
 # =====================================================================
@@ -71,10 +72,9 @@ def prepare_reviews_table(connection):
                 connection.commit()
                 print(f"✅ Added review_embedding column")
             else:
+                # No need to clear old vectors: unchanged reviews are served
+                # from the embedding cache and only changed text is re-embedded.
                 print("ℹ️  review_embedding column already exists")
-                cursor.execute("UPDATE Reviews SET review_embedding = NULL")
-                connection.commit()
-                print("✅ Cleared existing embeddings for a fresh start.")
 
             # 2. Create the vector index if it doesn't exist
             cursor.execute("""
@@ -106,13 +106,12 @@ def fetch_reviews(connection):
     """Fetch all reviews with text"""
     try:
         with connection.cursor() as cursor:
-            # We'll vectorize ALL reviews, even ones with just text,
-            # but we'll focus on those with text.
+            # We'll vectorize ALL reviews with text. Rows whose text has not
+            # changed since the last run are answered by the embedding cache.
             cursor.execute("""
                 SELECT review_id, rating, review_text
                 FROM Reviews
                 WHERE review_text IS NOT NULL AND review_text != ''
-                AND review_embedding IS NULL
             """)
             reviews = cursor.fetchall()
             print(f"✅ Fetched {len(reviews)} reviews to be vectorized.")
@@ -125,45 +124,33 @@ def generate_embeddings_gemini(reviews):
     """Generate embeddings using Google Gemini API"""
     print(f"\n🔄 Initializing Google Gemini API...")
     
-    genai.configure(api_key=API_KEY)
+    engine = build_engine(API_KEY, MODEL_NAME, dimension=EMBEDDING_DIMENSION)
     
-    print(f"🔄 Generating embeddings using {MODEL_NAME}...")
+    print(f"🔄 Generating embeddings using {engine.model_name}...")
     embeddings_data = []
     failed_reviews = []
     
-    for i, review in enumerate(reviews, 1):
-        # --- FEATURE ENGINEERING ---
-        # We combine rating and text for better semantic context.
-        text_to_embed = (
+    # --- FEATURE ENGINEERING ---
+    # We combine rating and text for better semantic context.
+    texts_to_embed = [
+        (
             f"Review Text: {review['review_text']} "
             f"Rating: {review['rating']}/5"
         )
-        
-        try:
-            # Generate embedding using Gemini
-            result = genai.embed_content(
-                model=MODEL_NAME,
-                content=text_to_embed,
-                task_type="retrieval_document" # Store this vector
-            )
-            
-            embedding = result['embedding']
-            
-            embeddings_data.append({
-                'review_id': review['review_id'],
-                'embedding': embedding
-            })
-            
-            if i % 10 == 0 or i == len(reviews):
-                print(f"   Progress: {i}/{len(reviews)} reviews embedded")
-            
-            # Rate limiting: 60 requests/minute
-            time.sleep(1.1)
-                
-        except Exception as e:
-            print(f"⚠️  Error embedding review {review['review_id']}: {e}")
+        for review in reviews
+    ]
+    
+    # Batched + concurrent; rate limiting and retries live in the engine
+    embeddings = engine.embed(texts_to_embed, task_type="retrieval_document", label="reviews") # Store these vectors
+    
+    for review, embedding in zip(reviews, embeddings):
+        if embedding is None:
             failed_reviews.append(review['review_id'])
-            time.sleep(2)
+            continue
+        embeddings_data.append({
+            'review_id': review['review_id'],
+            'embedding': embedding
+        })
     
     print(f"\n✅ Generated embeddings for {len(embeddings_data)} reviews")
     if failed_reviews:
@@ -171,45 +158,16 @@ def generate_embeddings_gemini(reviews):
     
     return embeddings_data
 
-def vector_to_string(vector):
-    """Convert vector list to MariaDB VECTOR format string"""
-    vector_str = '[' + ','.join([f"{v:.8f}" for v in vector]) + ']'
-    return vector_str
-
 def load_embeddings_to_db(connection, embeddings_data):
-    """Load embeddings into MariaDB"""
+    """Load embeddings into MariaDB (binary float32 VECTOR values, batched)"""
     print("\n🔄 Loading embeddings into database...")
     
     try:
-        with connection.cursor() as cursor:
-            update_count = 0
-            errors = []
-            
-            for data in embeddings_data:
-                review_id = data['review_id']
-                embedding_vector = vector_to_string(data['embedding'])
-                
-                try:
-                    # Update review with embedding
-                    sql = """
-                        UPDATE Reviews 
-                        SET review_embedding = VEC_FromText(%s)
-                        WHERE review_id = %s
-                    """
-                    cursor.execute(sql, (embedding_vector, review_id))
-                    update_count += 1
-                    
-                    if update_count % 10 == 0 or update_count == len(embeddings_data):
-                        connection.commit()
-                        print(f"   Progress: {update_count}/{len(embeddings_data)} reviews updated")
-                        
-                except Exception as e:
-                    print(f"⚠️  Error updating review {review_id}: {e}")
-                    errors.append(review_id)
-            
-            # Final commit
-            connection.commit()
-            print(f"\n✅ Successfully loaded embeddings for {update_count} reviews!")
+        update_count, errors = load_vectors(connection, 'Reviews', embeddings_data, id_key='review_id')
+        print(f"\n✅ Successfully loaded embeddings for {update_count} reviews!")
+        
+        if errors:
+            print(f"⚠️  Errors occurred for reviews: {errors}")
             
     except Exception as e:
         connection.rollback()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+AetherMart Search Service Load Test
+Drives Milestone4_task3_search_service.py with N concurrent clients and
+reports throughput and tail latency (p50 / p95 / p99).
+
+    python3 Milestone4_task3_search_loadtest.py --concurrency 32 --duration 30
+    python3 Milestone4_task3_search_loadtest.py --kind reviews --concurrency 8 --requests 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+
+import aiohttp
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+DEFAULT_URL = "http://localhost:8080"
+
+SAMPLE_QUERIES = {
+    'products': [
+        "durable work gloves", "quiet mechanical keyboard", "smart home hub",
+        "wireless noise cancelling headphones", "ergonomic office chair", "4k gaming monitor",
+    ],
+    'reviews': [
+        "good battery life", "great sound quality", "bad customer service",
+        "terrible packaging", "excellent build quality", "decent value for money",
+    ],
+    'customers': [
+        "buys electronics and books", "customer 15", "buys sports and health products",
+        "buys toys and groceries", "buys furniture and home goods",
+    ],
+}
+# =====================================================================
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+async def client(session, args, queries, deadline, counter, latencies, statuses):
+    """One simulated user: issues requests back to back until the test ends."""
+    while time.monotonic() < deadline:
+        if args.requests and next(counter) >= args.requests:
+            return
+        kind = random.choice(args.kinds)
+        params = {'q': random.choice(queries[kind]), 'limit': args.limit}
+        started_at = time.perf_counter()
+        try:
+            async with session.get(f"{args.url}/search/{kind}", params=params) as response:
+                await response.read()
+                statuses[response.status] += 1
+        except asyncio.TimeoutError:
+            statuses['timeout'] += 1
+        except aiohttp.ClientError as e:
+            statuses[type(e).__name__] += 1
+        latencies.append((time.perf_counter() - started_at) * 1000)
+
+
+async def run(args):
+    queries = SAMPLE_QUERIES
+    latencies = []
+    statuses = Counter()
+    counter = itertools.count()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        started_at = time.monotonic()
+        deadline = started_at + args.duration
+        await asyncio.gather(*[
+            client(session, args, queries, deadline, counter, latencies, statuses)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.monotonic() - started_at
+
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the semantic search service.")
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent clients")
+    parser.add_argument('--duration', type=float, default=30, help="seconds (upper bound)")
+    parser.add_argument('--requests', type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument('--kind', choices=['products', 'reviews', 'customers', 'all'], default='all')
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30, help="client-side timeout per request")
+    args = parser.parse_args()
+    args.kinds = list(SAMPLE_QUERIES) if args.kind == 'all' else [args.kind]
+
+    print("=" * 70)
+    print("       AetherMart Search Service Load Test")
+    print("=" * 70)
+    print(f"🎯 {args.url} | {args.concurrency} clients | kinds: {', '.join(args.kinds)}")
+
+    latencies, statuses, elapsed = asyncio.run(run(args))
+    if not latencies:
+        print("⚠️  No requests completed.")
+        return
+
+    ok = statuses.get(200, 0)
+    print(f"\n📊 {len(latencies)} requests in {elapsed:.1f}s")
+    print(f"   Throughput: {len(latencies) / elapsed:.1f} req/s ({ok / elapsed:.1f} successful req/s)")
+    print(f"   Latency ms: p50={percentile(latencies, 50):.1f}  p95={percentile(latencies, 95):.1f}  "
+          f"p99={percentile(latencies, 99):.1f}  max={max(latencies):.1f}")
+    print(f"   Outcomes:   {', '.join(f'{k}={v}' for k, v in sorted(statuses.items(), key=str))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+AetherMart Semantic Search Service
+asyncio HTTP front end (aiohttp) for the semantic search engine in
+Milestone4_task3_semantic_search_interface.py, so many users can search
+at the same time.
+
+ - Blocking work (Gemini embedding, pymysql queries) is offloaded to a
+   thread pool; each request borrows a connection from the shared pool.
+ - Query embeddings go through the LRU query cache; cache misses from
+   concurrent requests are coalesced into batch embedding calls by
+   EmbeddingBatcher (EMBED_BATCH_WINDOW_MS, 0 disables batching).
+ - Every request has a timeout (SEARCH_REQUEST_TIMEOUT seconds).
+
+Endpoints:
+    GET /search/products?q=durable+work+gloves&limit=5
+    GET /search/reviews?q=great+battery&rating=4&rating=5   (rating optional: auto-detected like the CLI)
+    GET /search/customers?q=buys+electronics+and+books
+    GET /health
+
+Run:
+    pip install aiohttp
+    python3 Milestone4_task3_search_service.py
+Load test: Milestone4_task3_search_loadtest.py
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from datetime import date, datetime
+
+from aiohttp import web
+
+from Milestone4_task3_connection_pool import ConnectionPool
+from Milestone4_task3_embedding_batcher import EMBED_BATCH_WINDOW_MS, EmbeddingBatcher
+from Milestone4_task3_semantic_search_interface import (
+    DB_CONFIG, QUERY_CACHE, SEARCH_RESULT_LIMIT, detect_rating_filters, embed_search_queries,
+    fetch_customer_evidence, get_search_backend, get_search_vector, init_embedding_client
+)
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+SERVICE_HOST = os.environ.get('SEARCH_SERVICE_HOST', '0.0.0.0')
+SERVICE_PORT = int(os.environ.get('SEARCH_SERVICE_PORT', 8080))
+SERVICE_WORKERS = int(os.environ.get('SEARCH_SERVICE_WORKERS', 16))   # threads for blocking calls
+SEARCH_REQUEST_TIMEOUT = float(os.environ.get('SEARCH_REQUEST_TIMEOUT', 10))
+MAX_RESULT_LIMIT = 100
+# =====================================================================
+
+
+class EmbeddingUnavailable(Exception):
+    """get_search_vector() could not embed the query."""
+
+
+def to_json(value):
+    """json.dumps default= hook for DB types."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return None
+    return str(value)
+
+
+def json_response(payload, status=200):
+    return web.json_response(payload, status=status, dumps=lambda p: json.dumps(p, default=to_json))
+
+
+class SearchService:
+    """Holds the shared pool, backend and executor for all requests."""
+
+    def __init__(self):
+        init_embedding_client()
+        self.executor = ThreadPoolExecutor(max_workers=SERVICE_WORKERS, thread_name_prefix='search')
+        self.pool = ConnectionPool(DB_CONFIG, max_size=SERVICE_WORKERS)
+        self.backend = get_search_backend()
+        self.batcher = None
+        if EMBED_BATCH_WINDOW_MS > 0:
+            self.batcher = EmbeddingBatcher(embed_search_queries, self.run_blocking)
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def embed(self, search_query):
+        if self.batcher is None:
+            return await self.run_blocking(get_search_vector, search_query, "retrieval_query")
+        cached = QUERY_CACHE.get(search_query, "retrieval_query")
+        if cached is not None:
+            return cached
+        try:
+            return await self.batcher.embed(search_query, "retrieval_query")
+        except Exception as e:
+            print(f"❌ Batch embedding failed: {e}")
+            return None
+
+    def _query(self, kind, query_vector, limit, rating_filters):
+        with self.pool.connection() as connection:
+            if kind == 'products':
+                return self.backend.products(connection, query_vector, limit)
+            if kind == 'reviews':
+                return self.backend.reviews(connection, query_vector, rating_filters, limit)
+            results = self.backend.customers(connection, query_vector, limit)
+            evidence = fetch_customer_evidence(connection, [row['customer_id'] for row in results])
+            return [dict(row, **{k: v for k, v in evidence.get(row['customer_id'], {}).items()
+                                 if k != 'customer_id'})
+                    for row in results]
+
+    async def _run(self, kind, search_query, limit, rating_filters, timings):
+        started_at = time.perf_counter()
+        query_vector = await self.embed(search_query)
+        timings['embed_ms'] = (time.perf_counter() - started_at) * 1000
+        if not query_vector:
+            raise EmbeddingUnavailable()
+
+        db_started_at = time.perf_counter()
+        results = await self.run_blocking(self._query, kind, query_vector, limit, rating_filters)
+        timings['db_ms'] = (time.perf_counter() - db_started_at) * 1000
+        return results
+
+    async def search(self, kind, request):
+        search_query = request.query.get('q', '').strip()
+        if not search_query:
+            return json_response({'error': "missing query parameter 'q'"}, status=400)
+        try:
+            limit = min(MAX_RESULT_LIMIT, max(1, int(request.query.get('limit', SEARCH_RESULT_LIMIT))))
+            rating_filters = [int(r) for r in request.query.getall('rating', [])]
+        except ValueError:
+            return json_response({'error': "'limit' and 'rating' must be integers"}, status=400)
+        if kind == 'reviews' and not rating_filters:
+            rating_filters, _ = detect_rating_filters(search_query)
+
+        timings = {}
+        started_at = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(
+                self._run(kind, search_query, limit, rating_filters, timings),
+                timeout=SEARCH_REQUEST_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return json_response({'error': f'search timed out after {SEARCH_REQUEST_TIMEOUT}s'}, status=504)
+        except EmbeddingUnavailable:
+            return json_response({'error': 'embedding service unavailable'}, status=502)
+        except Exception as e:
+            return json_response({'error': str(e)}, status=500)
+
+        for row in results:
+            row['similarity'] = round((1 - row['distance']) * 100, 2)
+        timings['total_ms'] = (time.perf_counter() - started_at) * 1000
+        return json_response({
+            'query': search_query,
+            'kind': kind,
+            'backend': self.backend.name,
+            'rating_filters': rating_filters if kind == 'reviews' else None,
+            'results': results,
+            'timings': {k: round(v, 2) for k, v in timings.items()},
+        })
+
+    async def search_products(self, request):
+        return await self.search('products', request)
+
+    async def search_reviews(self, request):
+        return await self.search('reviews', request)
+
+    async def search_customers(self, request):
+        return await self.search('customers', request)
+
+    async def health(self, request):
+        return json_response({'status': 'ok', 'backend': self.backend.name,
+                              'query_cache': QUERY_CACHE.stats(),
+                              'embedding_batches': self.batcher.stats() if self.batcher else None})
+
+    async def close(self, app):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+
+def create_app():
+    service = SearchService()
+    app = web.Application()
+    app.router.add_get('/search/products', service.search_products)
+    app.router.add_get('/search/reviews', service.search_reviews)
+    app.router.add_get('/search/customers', service.search_customers)
+    app.router.add_get('/health', service.health)
+    app.on_cleanup.append(service.close)
+    app['service'] = service
+    return app
+
+
+def main():
+    print("=" * 70)
+    print("     **   AetherMart Semantic Search Service   **     ")
+    print("=" * 70)
+    print(f"🚀 Listening on http://{SERVICE_HOST}:{SERVICE_PORT} "
+          f"({SERVICE_WORKERS} workers, {SEARCH_REQUEST_TIMEOUT}s timeout)")
+    web.run_app(create_app(), host=SERVICE_HOST, port=SERVICE_PORT, print=None)
+
+
+if __name__ == "__main__":
+    main()
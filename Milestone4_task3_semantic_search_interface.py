@@ -8,12 +8,35 @@ v5 Update: Refines Customer Search evidence per user request.
  - Removes text of reviews.
  - Shows last 5 products purchased.
  - Shows the customer's average rating.
+
+v6 Update: Latency.
+ - One long-lived connection pool (health-checked, reconnecting) shared
+   by all three searches instead of a new connection per search.
+ - The Gemini client is configured once per process.
+ - Prints per-stage timings for every search and p50/p99 on exit.
+ - Repeated queries skip the embedding call via an LRU query cache
+   (TTL + size eviction, optional on-disk tier via QUERY_CACHE_PATH).
+ - Customer "evidence" (categories, last 5 products, average rating) is
+   fetched for all results in one batched query instead of 2 per row.
+
+v7 Update: Pluggable search backend (SEARCH_BACKEND env var).
+ - 'sql' (default): ORDER BY VEC_DISTANCE_COSINE(...) in MariaDB.
+ - 'ann': in-process NumPy IVF index, rows hydrated by primary key
+   (see Milestone4_task3_ann_index.py).
+ - 'exact': brute-force cosine over memory-mapped .npy snapshots
+   (see Milestone4_task3_vector_snapshot.py).
 """
 
 import pymysql
 import google.generativeai as genai
 import sys
 import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from Milestone4_task3_connection_pool import ConnectionPool
+from Milestone4_task3_embedding_cache import open_query_cache
 
 # =====================================================================
 # CONFIGURATION - EDIT THESE VALUES
@@ -29,6 +52,8 @@ if not API_KEY:
 
 MODEL_NAME = "models/embedding-001"
 EMBEDDING_DIMENSION = 768
+SEARCH_RESULT_LIMIT = int(os.environ.get('SEARCH_RESULT_LIMIT', 5))
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'sql')   # 'sql', 'ann' or 'exact'
 
 DB_CONFIG = {
     'host': DB_HOST,
@@ -40,27 +65,99 @@ DB_CONFIG = {
 }
 # =====================================================================
 
+QUERY_CACHE = open_query_cache(MODEL_NAME)
+
+_embedding_client_ready = False
+
+def init_embedding_client():
+    """Configures the Gemini client once per process."""
+    global _embedding_client_ready
+    if not _embedding_client_ready:
+        genai.configure(api_key=API_KEY)
+        _embedding_client_ready = True
+
+class SearchTimings:
+    """Collects per-stage latencies (in ms) and reports p50/p99."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.current = {}
+
+    @contextmanager
+    def stage(self, name):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            self.samples[name].append(elapsed_ms)
+            self.current[name] = elapsed_ms
+
+    def print_last(self):
+        if self.current:
+            line = ' | '.join(f"{name} {ms:.1f} ms" for name, ms in self.current.items())
+            print(f"\n⏱️  Timings: {line}")
+        self.current = {}
+
+    @staticmethod
+    def percentile(values, pct):
+        """Nearest-rank percentile."""
+        ordered = sorted(values)
+        rank = max(1, -(-len(ordered) * pct // 100))  # ceil without importing math
+        return ordered[int(rank) - 1]
+
+    def print_summary(self):
+        if not self.samples:
+            return
+        print("\n📊 Latency summary (ms):")
+        for name, values in self.samples.items():
+            print(f"   • {name:<6} n={len(values):<4} "
+                  f"p50={self.percentile(values, 50):.1f}  p99={self.percentile(values, 99):.1f}")
+
 def get_search_vector(search_query, task_type):
-    """Converts the user's text query into a vector."""
+    """Converts the user's text query into a vector (cached per normalized query)."""
+    cached = QUERY_CACHE.get(search_query, task_type)
+    if cached is not None:
+        print(f"⚡ Search query '{search_query}' served from the query cache")
+        return cached
+    
     print(f"🔄 Vectorizing search query: '{search_query}'...")
     try:
-        genai.configure(api_key=API_KEY)
+        init_embedding_client()
         result = genai.embed_content(
             model=MODEL_NAME,
             content=search_query,
             task_type=task_type 
         )
+        QUERY_CACHE.put(search_query, task_type, result['embedding'])
         return result['embedding']
     except Exception as e:
         print(f"❌ Error calling Google API: {e}")
         print("   (Did you set your API key? Is billing enabled?)")
         return None # Return None on failure
 
+def embed_search_queries(search_queries, task_type):
+    """
+    Embeds several queries with ONE API call (used by the service's
+    micro-batcher). Returns vectors aligned with search_queries and fills
+    the query cache; raises on API errors so the caller can fail the batch.
+    """
+    init_embedding_client()
+    result = genai.embed_content(
+        model=MODEL_NAME,
+        content=list(search_queries),
+        task_type=task_type
+    )
+    vectors = result['embedding']
+    for search_query, vector in zip(search_queries, vectors):
+        QUERY_CACHE.put(search_query, task_type, vector)
+    return vectors
+
 def vector_to_string(vector):
     """Converts vector list to MariaDB VECTOR format string"""
     return '[' + ','.join([f"{v:.8f}" for v in vector]) + ']'
 
-def find_similar_products(connection, query_vector_str):
+def find_similar_products(connection, query_vector_str, limit=SEARCH_RESULT_LIMIT):
     """Searches the database for similar products."""
     print("🔍 Searching database for similar PRODUCTS...")
     try:
@@ -77,15 +174,15 @@ def find_similar_products(connection, query_vector_str):
                 FROM Products
                 WHERE product_embedding IS NOT NULL
                 ORDER BY distance ASC
-                LIMIT 5;
+                LIMIT %s;
             """
-            cursor.execute(sql, (query_vector_str,))
+            cursor.execute(sql, (query_vector_str, limit))
             return cursor.fetchall()
     except Exception as e:
         print(f"❌ Error searching database: {e}")
         return []
 
-def find_similar_reviews(connection, query_vector_str, rating_filters):
+def find_similar_reviews(connection, query_vector_str, rating_filters, limit=SEARCH_RESULT_LIMIT):
     """
     Searches the database for similar reviews using
     HYBRID SEARCH (Vector + SQL Filter).
@@ -118,7 +215,8 @@ def find_similar_reviews(connection, query_vector_str, rating_filters):
                 params.extend(rating_filters) # Add the ratings to the parameter list
             # --- END NEW LOGIC ---
 
-            sql += " ORDER BY distance ASC LIMIT 5;"
+            sql += " ORDER BY distance ASC LIMIT %s;"
+            params.append(limit)
             
             cursor.execute(sql, tuple(params))
             return cursor.fetchall()
@@ -127,8 +225,12 @@ def find_similar_reviews(connection, query_vector_str, rating_filters):
         print(f"❌ Error searching database: {e}")
         return []
 
-def find_similar_customers(connection, query_vector_str):
-    """Searches the database for 'lookalike' customers."""
+def find_similar_customers(connection, query_vector_str, limit=SEARCH_RESULT_LIMIT):
+    """
+    Searches the database for 'lookalike' customers.
+    Purchase categories are NOT computed here (no correlated subquery per
+    candidate row); fetch_customer_evidence() adds them for the top hits.
+    """
     print("🔍 Searching database for 'lookalike' CUSTOMERS...")
     try:
         with connection.cursor() as cursor:
@@ -139,12 +241,6 @@ def find_similar_customers(connection, query_vector_str):
                     c.last_name,
                     c.city,
                     c.state,
-                    (SELECT GROUP_CONCAT(DISTINCT cat.category_name SEPARATOR ', ')
-                     FROM Orders o
-                     JOIN Order_Items oi ON o.order_id = oi.order_id
-                     JOIN Products p ON oi.product_id = p.product_id
-                     JOIN Categories cat ON p.category_id = cat.category_id
-                     WHERE o.customer_id = c.customer_id) AS purchase_categories,
                     VEC_DISTANCE_COSINE(
                         c.customer_embedding, 
                         VEC_FromText(%s)
@@ -152,22 +248,122 @@ def find_similar_customers(connection, query_vector_str):
                 FROM Customers c
                 WHERE c.customer_embedding IS NOT NULL
                 ORDER BY distance ASC
-                LIMIT 5;
+                LIMIT %s;
             """
-            cursor.execute(sql, (query_vector_str,))
+            cursor.execute(sql, (query_vector_str, limit))
             return cursor.fetchall()
     except Exception as e:
         print(f"❌ Error searching database: {e}")
         print("   (Did you run 'create_customer_index.sql' first?)")
         return []
 
+def detect_rating_filters(search_query):
+    """
+    HYBRID SEARCH keyword rules: maps sentiment words in a review query to
+    a rating filter. Returns (rating_filters, detected_label).
+    """
+    query_lower = search_query.lower()
+    if 'good' in query_lower or 'average' in query_lower or 'decent' in query_lower:
+        return [3], 'good'
+    if 'great' in query_lower or 'excellent' in query_lower or 'awesome' in query_lower or 'best' in query_lower:
+        return [4, 5], 'great'
+    if 'poor' in query_lower or 'bad' in query_lower or 'terrible' in query_lower or 'worst' in query_lower:
+        return [1, 2], 'bad'
+    return [], None
+
+class SqlSearchBackend:
+    """Default backend: the vector search runs inside MariaDB."""
+
+    name = 'sql'
+
+    def products(self, connection, query_vector, limit):
+        return find_similar_products(connection, vector_to_string(query_vector), limit)
+
+    def reviews(self, connection, query_vector, rating_filters, limit):
+        return find_similar_reviews(connection, vector_to_string(query_vector), rating_filters, limit)
+
+    def customers(self, connection, query_vector, limit):
+        return find_similar_customers(connection, vector_to_string(query_vector), limit)
+
+def get_search_backend(name=SEARCH_BACKEND):
+    """Returns the configured search backend ('sql', 'ann' or 'exact')."""
+    # Imported lazily so the default SQL path does not need NumPy
+    if name == 'ann':
+        from Milestone4_task3_ann_index import AnnSearchBackend
+        return AnnSearchBackend()
+    if name == 'exact':
+        from Milestone4_task3_vector_snapshot import SnapshotSearchBackend
+        return SnapshotSearchBackend()
+    return SqlSearchBackend()
+
+def fetch_customer_evidence(connection, customer_ids):
+    """
+    Fetches the "evidence" for every lookalike customer in ONE query:
+    purchase categories, the last 5 products bought and the average rating.
+    Returns {customer_id: row}. Round trips stay constant as the limit grows.
+    """
+    if not customer_ids:
+        return {}
+    id_list = ', '.join(['%s'] * len(customer_ids))
+    sql = f"""
+        WITH purchases AS (
+            SELECT
+                o.customer_id,
+                p.product_name,
+                cat.category_name,
+                ROW_NUMBER() OVER (
+                    PARTITION BY o.customer_id
+                    ORDER BY o.order_date DESC, oi.order_item_id DESC
+                ) AS recency
+            FROM Orders o
+            JOIN Order_Items oi ON o.order_id = oi.order_id
+            JOIN Products p ON oi.product_id = p.product_id
+            LEFT JOIN Categories cat ON p.category_id = cat.category_id
+            WHERE o.customer_id IN ({id_list})
+        ),
+        purchase_summary AS (
+            SELECT
+                customer_id,
+                GROUP_CONCAT(DISTINCT category_name SEPARATOR ', ') AS purchase_categories,
+                GROUP_CONCAT(
+                    CASE WHEN recency <= 5 THEN product_name END
+                    ORDER BY recency SEPARATOR ', '
+                ) AS last_products
+            FROM purchases
+            GROUP BY customer_id
+        ),
+        ratings AS (
+            SELECT customer_id, AVG(rating) AS avg_rating
+            FROM Reviews
+            WHERE customer_id IN ({id_list})
+            AND rating IS NOT NULL AND rating > 0
+            GROUP BY customer_id
+        )
+        SELECT
+            c.customer_id,
+            ps.purchase_categories,
+            ps.last_products,
+            r.avg_rating
+        FROM Customers c
+        LEFT JOIN purchase_summary ps ON ps.customer_id = c.customer_id
+        LEFT JOIN ratings r ON r.customer_id = c.customer_id
+        WHERE c.customer_id IN ({id_list});
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, tuple(customer_ids) * 3)
+        return {row['customer_id']: row for row in cursor.fetchall()}
+
 def main():
     """Main execution loop"""
     print("=" * 70)
     print("     **   AetherMart Semantic Search Engine   **     ")
     print("=" * 70)
     
-    connection = None
+    init_embedding_client()
+    pool = ConnectionPool(DB_CONFIG)
+    timings = SearchTimings()
+    backend = get_search_backend()
+    print(f"ℹ️  Search backend: {backend.name}")
     
     while True:
         print("\n--- Main Menu ---")
@@ -182,13 +378,13 @@ def main():
             search_query = input("\n🔍 Enter PRODUCT search (e.g. 'durable work gloves'): ")
             if not search_query: continue
             
-            query_vector = get_search_vector(search_query, "retrieval_query")
+            with timings.stage('embed'):
+                query_vector = get_search_vector(search_query, "retrieval_query")
             if not query_vector: continue
-            query_vector_str = vector_to_string(query_vector)
             
             try:
-                connection = pymysql.connect(**DB_CONFIG)
-                results = find_similar_products(connection, query_vector_str)
+                with timings.stage('db'), pool.connection() as connection:
+                    results = backend.products(connection, query_vector, SEARCH_RESULT_LIMIT)
                 
                 print("\n" + "=" * 70)
                 print("✨ Here are the most similar products:")
@@ -206,7 +402,7 @@ def main():
             except Exception as e:
                 print(f"\n❌ Fatal error: {e}")
             finally:
-                if connection: connection.close()
+                timings.print_last()
 
         # --- REVIEW SEARCH (HYBRID) ---
         elif choice == '2':
@@ -214,28 +410,20 @@ def main():
             if not search_query: continue
             
             # --- NEW HYBRID LOGIC ---
-            query_lower = search_query.lower()
-            rating_filters = []
-            
-            if 'good' in query_lower or 'average' in query_lower or 'decent' in query_lower:
-                rating_filters = [3]
-                print("   (Hybrid Search: Detected 'good', filtering for 3-star ratings)")
-            elif 'great' in query_lower or 'excellent' in query_lower or 'awesome' in query_lower or 'best' in query_lower:
-                rating_filters = [4, 5]
-                print("   (Hybrid Search: Detected 'great', filtering for 4 & 5-star ratings)")
-            elif 'poor' in query_lower or 'bad' in query_lower or 'terrible' in query_lower or 'worst' in query_lower:
-                rating_filters = [1, 2]
-                print("   (Hybrid Search: Detected 'bad', filtering for 1 & 2-star ratings)")
+            rating_filters, detected = detect_rating_filters(search_query)
+            if rating_filters:
+                stars = ' & '.join(str(r) for r in rating_filters)
+                print(f"   (Hybrid Search: Detected '{detected}', filtering for {stars}-star ratings)")
             # --- END NEW LOGIC ---
 
-            query_vector = get_search_vector(search_query, "retrieval_query")
+            with timings.stage('embed'):
+                query_vector = get_search_vector(search_query, "retrieval_query")
             if not query_vector: continue
-            query_vector_str = vector_to_string(query_vector)
             
             try:
-                connection = pymysql.connect(**DB_CONFIG)
-                # Pass the new rating_filters to the function
-                results = find_similar_reviews(connection, query_vector_str, rating_filters)
+                with timings.stage('db'), pool.connection() as connection:
+                    # Pass the new rating_filters to the function
+                    results = backend.reviews(connection, query_vector, rating_filters, SEARCH_RESULT_LIMIT)
 
                 print("\n" + "=" * 70)
                 print("✨ Here are the most similar reviews:")
@@ -253,7 +441,7 @@ def main():
             except Exception as e:
                 print(f"\n❌ Fatal error: {e}")
             finally:
-                if connection: connection.close()
+                timings.print_last()
 
         # --- CUSTOMER SEARCH ---
         elif choice == '3':
@@ -264,13 +452,17 @@ def main():
             search_query = input("\n🔍 Enter CUSTOMER search: ")
             if not search_query: continue
             
-            query_vector = get_search_vector(search_query, "retrieval_query")
+            with timings.stage('embed'):
+                query_vector = get_search_vector(search_query, "retrieval_query")
             if not query_vector: continue
-            query_vector_str = vector_to_string(query_vector)
 
             try:
-                connection = pymysql.connect(**DB_CONFIG)
-                results = find_similar_customers(connection, query_vector_str)
+                with timings.stage('db'), pool.connection() as connection:
+                    results = backend.customers(connection, query_vector, SEARCH_RESULT_LIMIT)
+                    # --- "Evidence" for ALL results in one batched query ---
+                    evidence = fetch_customer_evidence(
+                        connection, [item['customer_id'] for item in results]
+                    )
                 
                 print("\n" + "=" * 70)
                 print("✨ Here are the 'lookalike' customers:")
@@ -280,49 +472,25 @@ def main():
                     print("No similar customers found.")
                 else:
                     for item in results:
+                        facts = evidence.get(item['customer_id'], {})
                         similarity = (1 - item['distance']) * 100
                         print(f"\n✅ {item['first_name']} {item['last_name']} (ID: {item['customer_id']})")
                         print(f"   Similarity: {similarity:.2f}%")
                         print(f"   Location:   {item['city']}, {item['state']}")
-                        print(f"   Profile:    Buys {item['purchase_categories'] or 'N/A'}")
+                        print(f"   Profile:    Buys {facts.get('purchase_categories') or 'N/A'}")
+                        
+                        if facts.get('last_products'):
+                            print(f"   Last 5:     {facts['last_products']}")
                         
-                        # --- "Evidence" Queries (MODIFIED per user request) ---
-                        with connection.cursor() as evidence_cursor:
-                            
-                            # --- 1. Get LAST 5 Products Bought ---
-                            sql_products = """
-                                SELECT p.product_name
-                                FROM Orders o
-                                JOIN Order_Items oi ON o.order_id = oi.order_id
-                                JOIN Products p ON oi.product_id = p.product_id
-                                WHERE o.customer_id = %s
-                                ORDER BY o.order_date DESC
-                                LIMIT 5;
-                            """
-                            evidence_cursor.execute(sql_products, (item['customer_id'],))
-                            products_bought = evidence_cursor.fetchall()
-                            if products_bought:
-                                product_names = [p['product_name'] for p in products_bought]
-                                print(f"   Last 5:     {', '.join(product_names)}")
-
-                            # --- 2. Get Average Rating ---
-                            sql_avg_rating = """
-                                SELECT AVG(rating) as avg_rating
-                                FROM Reviews
-                                WHERE customer_id = %s
-                                AND rating IS NOT NULL AND rating > 0;
-                            """
-                            evidence_cursor.execute(sql_avg_rating, (item['customer_id'],))
-                            rating_result = evidence_cursor.fetchone()
-                            if rating_result and rating_result['avg_rating']:
-                                print(f"   Avg Rating: {rating_result['avg_rating']:.2f} / 5.00")
-                            else:
-                                print(f"   Avg Rating: N/A (No reviews written)")
+                        if facts.get('avg_rating'):
+                            print(f"   Avg Rating: {facts['avg_rating']:.2f} / 5.00")
+                        else:
+                            print(f"   Avg Rating: N/A (No reviews written)")
 
             except Exception as e:
                 print(f"\n❌ Fatal error: {e}")
             finally:
-                if connection: connection.close()
+                timings.print_last()
 
         # --- EXIT ---
         elif choice == '4':
@@ -332,9 +500,13 @@ def main():
         else:
             print("\n❌ Invalid choice. Please enter 1, 2, 3, or 4.")
             
-    if connection and connection.open:
-        connection.close()
-        print("\n🔒 Database connection closed.")
+    timings.print_summary()
+    stats = QUERY_CACHE.stats()
+    print(f"\n📦 Query cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, "
+          f"{stats['misses']} misses ({stats['hit_ratio']:.1%} hit ratio), "
+          f"{stats['evictions']} evicted, {stats['expirations']} expired")
+    pool.close()
+    print("\n🔒 Database connection pool closed.")
 
 if __name__ == "__main__":
     main()
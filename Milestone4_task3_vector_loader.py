@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+AetherMart Binary Vector Loader
+Writes embeddings into the VECTOR columns of Products, Customers and
+Reviews as packed little-endian float32 buffers (the native VECTOR
+layout) instead of formatting ~10 KB of text per row for VEC_FromText.
+
+Each batch is sent as one multi-row INSERT into a temporary staging
+table and applied with a single UPDATE ... JOIN, so a batch costs two
+statements instead of one UPDATE round trip per row. (A direct
+INSERT ... ON DUPLICATE KEY UPDATE on the base tables is rejected in
+strict mode because of their NOT NULL columns.)
+
+Benchmark text vs binary path:
+    python3 Milestone4_task3_vector_loader.py --rows 2000          # encoding only
+    python3 Milestone4_task3_vector_loader.py --rows 2000 --db     # also round-trips MariaDB
+"""
+
+import os
+import random
+import sys
+import time
+
+import pymysql
+
+from Milestone4_task3_embedding_engine import pack_vector
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+DB_USER = "alex"
+DB_PASS = "alex_pass"
+DB_HOST = "localhost"
+DB_NAME = "aethermart_db"
+
+EMBEDDING_DIMENSION = 768
+VECTOR_LOAD_BATCH_SIZE = int(os.environ.get('VECTOR_LOAD_BATCH_SIZE', 500))
+
+# table -> (primary key column, vector column)
+VECTOR_TABLES = {
+    'Products': ('product_id', 'product_embedding'),
+    'Customers': ('customer_id', 'customer_embedding'),
+    'Reviews': ('review_id', 'review_embedding'),
+}
+
+DB_CONFIG = {
+    'host': DB_HOST,
+    'user': DB_USER,
+    'password': DB_PASS,
+    'database': DB_NAME,
+    'charset': 'utf8mb4',
+    'cursorclass': pymysql.cursors.DictCursor
+}
+# =====================================================================
+
+
+def vector_to_string(vector):
+    """Legacy text encoding for VEC_FromText (kept for the benchmark)."""
+    return '[' + ','.join([f"{v:.8f}" for v in vector]) + ']'
+
+
+def _staging_table(table):
+    return f"tmp_{table.lower()}_vector_load"
+
+
+def load_vectors(connection, table, embeddings_data, id_key,
+                 batch_size=VECTOR_LOAD_BATCH_SIZE, dimension=EMBEDDING_DIMENSION, columns=None):
+    """
+    Loads [{id_key: ..., 'embedding': [...]}, ...] into the table's VECTOR
+    column in batches. Every batch commits on its own.
+    Returns (rows_loaded, failed_ids).
+    """
+    id_column, vector_column = columns or VECTOR_TABLES[table]
+    staging = _staging_table(table)
+    loaded = 0
+    failed_ids = []
+    started_at = time.monotonic()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE IF NOT EXISTS {staging} (
+                row_id BIGINT UNSIGNED PRIMARY KEY,
+                vec VARBINARY({dimension * 4}) NOT NULL
+            )
+        """)
+
+        for start in range(0, len(embeddings_data), batch_size):
+            batch = embeddings_data[start:start + batch_size]
+            rows = [(data[id_key], pack_vector(data['embedding'])) for data in batch]
+            try:
+                cursor.execute(f"DELETE FROM {staging}")
+                # pymysql folds executemany on INSERT ... VALUES into one multi-row statement
+                cursor.executemany(f"INSERT INTO {staging} (row_id, vec) VALUES (%s, %s)", rows)
+                cursor.execute(f"""
+                    UPDATE {table} t
+                    JOIN {staging} s ON t.{id_column} = s.row_id
+                    SET t.{vector_column} = s.vec
+                """)
+                connection.commit()
+                loaded += len(rows)
+            except Exception as e:
+                connection.rollback()
+                print(f"⚠️  Error loading {table} batch {start + 1}-{start + len(rows)}: {e}")
+                failed_ids.extend(row_id for row_id, _ in rows)
+                continue
+
+            elapsed = time.monotonic() - started_at
+            rate = loaded / elapsed if elapsed > 0 else 0.0
+            print(f"   Progress: {loaded}/{len(embeddings_data)} {table.lower()} updated ({rate:.0f} rows/sec)")
+
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+
+    return loaded, failed_ids
+
+
+# =====================================================================
+# BENCHMARK
+# =====================================================================
+
+def _random_vectors(rows, dimension):
+    rng = random.Random(42)
+    return [[rng.uniform(-1.0, 1.0) for _ in range(dimension)] for _ in range(rows)]
+
+
+def benchmark_encoding(connection_escape, vectors):
+    """Encode time and escaped payload size (= bytes on the wire) per path."""
+    results = {}
+    for name, encode in (('text', vector_to_string), ('binary', pack_vector)):
+        started_at = time.monotonic()
+        wire_bytes = sum(len(connection_escape(encode(v))) for v in vectors)
+        elapsed = time.monotonic() - started_at
+        results[name] = (len(vectors) / elapsed, wire_bytes / len(vectors))
+    return results
+
+
+def benchmark_database(connection, vectors, dimension, batch_size):
+    """Round-trips both write paths against a scratch table."""
+    table = 'vector_load_benchmark'
+    results = {}
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                row_id BIGINT UNSIGNED PRIMARY KEY,
+                label VARCHAR(32) NOT NULL,
+                row_embedding VECTOR({dimension}) NULL
+            )
+        """)
+        cursor.executemany(f"INSERT INTO {table} (row_id, label) VALUES (%s, %s)",
+                           [(i, f"row {i}") for i in range(1, len(vectors) + 1)])
+        connection.commit()
+
+        # --- Legacy path: one UPDATE ... VEC_FromText per row ---
+        started_at = time.monotonic()
+        for i, vector in enumerate(vectors, 1):
+            cursor.execute(f"UPDATE {table} SET row_embedding = VEC_FromText(%s) WHERE row_id = %s",
+                           (vector_to_string(vector), i))
+            if i % 10 == 0:
+                connection.commit()
+        connection.commit()
+        results['text'] = len(vectors) / (time.monotonic() - started_at)
+
+    # --- Binary path ---
+    data = [{'row_id': i, 'embedding': v} for i, v in enumerate(vectors, 1)]
+    started_at = time.monotonic()
+    load_vectors(connection, table, data, 'row_id', batch_size=batch_size, dimension=dimension,
+                 columns=('row_id', 'row_embedding'))
+    results['binary'] = len(vectors) / (time.monotonic() - started_at)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    connection.commit()
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark text vs binary VECTOR writes.")
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--dimension', type=int, default=EMBEDDING_DIMENSION)
+    parser.add_argument('--batch-size', type=int, default=VECTOR_LOAD_BATCH_SIZE)
+    parser.add_argument('--db', action='store_true', help="also run both paths against MariaDB")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("       AetherMart Vector Write Path Benchmark")
+    print("=" * 70)
+
+    vectors = _random_vectors(args.rows, args.dimension)
+    connection = pymysql.connect(**DB_CONFIG) if args.db else None
+    if connection:
+        escape = connection.escape
+    else:
+        escape = lambda value: pymysql.converters.escape_item(value, 'utf8mb4')
+
+    try:
+        encoding = benchmark_encoding(escape, vectors)
+        print(f"\n📊 Encoding ({args.rows} rows x {args.dimension} dims):")
+        for name, (rate, bytes_per_row) in encoding.items():
+            print(f"   • {name:<6}: {rate:>10.0f} rows/sec   {bytes_per_row:>8.0f} bytes/row on the wire")
+
+        if connection:
+            loads = benchmark_database(connection, vectors, args.dimension, args.batch_size)
+            print(f"\n📊 End-to-end load into MariaDB:")
+            for name, rate in loads.items():
+                print(f"   • {name:<6}: {rate:>10.0f} rows/sec")
+    finally:
+        if connection:
+            connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
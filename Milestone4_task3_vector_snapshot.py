@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+AetherMart Vector Snapshots (Exact Search)
+Exports product_embedding / review_embedding / customer_embedding into
+contiguous, L2-normalized float32 .npy files with matching id arrays.
+Searches memory-map those files and run exact cosine top-k with one
+matrix-vector product plus argpartition, so every search process shares
+the same page cache instead of scanning MariaDB.
+
+Snapshots are refreshed incrementally: only rows whose CRC32 changed (or
+that are new) are re-read from MariaDB. Each refresh writes a new file
+version and then atomically swaps a small manifest, so readers never
+see a half-written snapshot.
+
+Refresh all snapshots (run from cron, or after the embedding generators):
+    python3 Milestone4_task3_vector_snapshot.py
+Select it in the search CLI with SEARCH_BACKEND=exact.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from Milestone4_task3_ann_index import (
+    ANN_TABLES, hydrate_rows, normalize_rows, top_k, vectors_from_buffers
+)
+
+# =====================================================================
+# CONFIGURATION
+# =====================================================================
+SNAPSHOT_DIR = os.environ.get('VECTOR_SNAPSHOT_DIR', 'vector_snapshots')
+SNAPSHOT_FETCH_BATCH = 1000   # changed vectors fetched per IN (...) query
+SNAPSHOT_KEEP_VERSIONS = 2    # current + previous: a reader may hold the old manifest a moment longer
+
+# Attribute columns are stored with a fixed dtype so they can be memory-mapped
+# (an object array cannot); NULL becomes ATTRIBUTE_NULL, which never matches a filter.
+ATTRIBUTE_DTYPES = {'rating': np.int16}
+ATTRIBUTE_NULL = -1
+# =====================================================================
+
+
+def _manifest_path(table, snapshot_dir):
+    return os.path.join(snapshot_dir, f"{table}.json")
+
+
+def _array_path(table, version, name, snapshot_dir):
+    return os.path.join(snapshot_dir, f"{table}.{version}.{name}.npy")
+
+
+def read_manifest(table, snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(_manifest_path(table, snapshot_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class VectorSnapshot:
+    """Read-only, memory-mapped view of one table's snapshot."""
+
+    def __init__(self, table, snapshot_dir=SNAPSHOT_DIR):
+        self.table = table
+        for attempt in range(SNAPSHOT_KEEP_VERSIONS + 1):
+            manifest = read_manifest(table, snapshot_dir)
+            if manifest is None:
+                raise FileNotFoundError(f"no snapshot for {table} in '{snapshot_dir}' (run the refresh first)")
+            try:
+                self._open(manifest, snapshot_dir)
+                return
+            except FileNotFoundError:
+                # Several refreshes replaced our version before we mapped it; re-read the manifest
+                if attempt == SNAPSHOT_KEEP_VERSIONS:
+                    raise
+
+    def _open(self, manifest, snapshot_dir):
+        version = manifest['version']
+        load = lambda name: np.load(_array_path(self.table, version, name, snapshot_dir), mmap_mode='r')
+        self.vectors = load('vectors')
+        self.ids = load('ids')
+        self.digests = load('digests')
+        self.attributes = {name: load(name) for name in manifest['attributes']}
+        self.version = version
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k, allowed=None):
+        """Exact cosine top-k: returns (ids, cosine distances)."""
+        if len(self) == 0:
+            return self.ids[:0], np.zeros(0, dtype=np.float32)
+        scores = self.vectors @ normalize_rows(query)
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+        best = top_k(scores, k)
+        best = best[np.isfinite(scores[best])]
+        return self.ids[best], 1.0 - scores[best]
+
+    def mask(self, attribute, values):
+        """Rows whose attribute is one of values; NULL (ATTRIBUTE_NULL) rows never match."""
+        values = [value for value in values if value is not None and value != ATTRIBUTE_NULL]
+        return np.isin(self.attributes[attribute], values)
+
+
+def _fetch_digests(connection, table):
+    spec = ANN_TABLES[table]
+    columns = [spec['id_column'], f"CRC32({spec['vector_column']}) AS digest"] + spec['attributes']
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {', '.join(columns)}
+            FROM {table}
+            WHERE {spec['vector_column']} IS NOT NULL
+            ORDER BY {spec['id_column']}
+        """)
+        return cursor.fetchall()
+
+
+def _fetch_vectors(connection, table, ids):
+    """{id: raw float32 buffer} for the given ids, in batches."""
+    spec = ANN_TABLES[table]
+    buffers = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), SNAPSHOT_FETCH_BATCH):
+            chunk = ids[start:start + SNAPSHOT_FETCH_BATCH]
+            cursor.execute(f"""
+                SELECT {spec['id_column']} AS row_id, {spec['vector_column']} AS vec
+                FROM {table}
+                WHERE {spec['id_column']} IN ({', '.join(['%s'] * len(chunk))})
+            """, tuple(chunk))
+            for row in cursor.fetchall():
+                buffers[row['row_id']] = row['vec']
+    return buffers
+
+
+def refresh_snapshot(connection, table, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Brings the table's snapshot up to date and returns a stats dict.
+    Unchanged rows are copied from the previous snapshot; only new or
+    changed vectors are read from MariaDB.
+    """
+    spec = ANN_TABLES[table]
+    os.makedirs(snapshot_dir, exist_ok=True)
+    started_at = time.perf_counter()
+
+    previous = None
+    if read_manifest(table, snapshot_dir) is not None:
+        previous = VectorSnapshot(table, snapshot_dir)
+    old_rows = {}
+    if previous is not None:
+        old_rows = {int(row_id): (i, int(digest))
+                    for i, (row_id, digest) in enumerate(zip(previous.ids, previous.digests))}
+
+    rows = _fetch_digests(connection, table)
+    ids = np.array([row[spec['id_column']] for row in rows], dtype=np.int64)
+    digests = np.array([row['digest'] for row in rows], dtype=np.uint32)
+    changed = [int(row_id) for row_id, digest in zip(ids, digests)
+               if old_rows.get(int(row_id), (None, None))[1] != int(digest)]
+    fresh = _fetch_vectors(connection, table, changed)
+
+    # Rows that vanished between the two queries are dropped
+    is_fresh = np.array([int(row_id) in fresh for row_id in ids], dtype=bool)
+    old_index = np.array([old_rows.get(int(row_id), (-1, None))[0] for row_id in ids], dtype=np.int64)
+    keep = is_fresh | (old_index >= 0)
+    ids, digests, is_fresh, old_index = ids[keep], digests[keep], is_fresh[keep], old_index[keep]
+    rows = [row for row, kept in zip(rows, keep) if kept]
+
+    dimension = previous.vectors.shape[1] if previous is not None and len(previous) else 0
+    if fresh:
+        dimension = len(next(iter(fresh.values()))) // 4
+    vectors = np.zeros((len(ids), dimension), dtype=np.float32)
+    if previous is not None and (~is_fresh).any():
+        vectors[~is_fresh] = previous.vectors[old_index[~is_fresh]]
+    fresh_positions = np.flatnonzero(is_fresh)
+    if len(fresh_positions):
+        buffers = [fresh[int(ids[p])] for p in fresh_positions]
+        vectors[fresh_positions] = normalize_rows(vectors_from_buffers(buffers))
+        digests[fresh_positions] = [zlib.crc32(b) for b in buffers]  # digest of what we actually stored
+
+    # --- Write a new version, then swap the manifest atomically ---
+    version = str(time.time_ns())  # never reuse a name a reader may still have mapped
+    arrays = {'vectors': vectors, 'ids': ids, 'digests': digests}
+    for name in spec['attributes']:
+        arrays[name] = np.array([row[name] if row[name] is not None else ATTRIBUTE_NULL for row in rows],
+                                dtype=ATTRIBUTE_DTYPES.get(name, np.int64))
+    for name, array in arrays.items():
+        np.save(_array_path(table, version, name, snapshot_dir), array)
+
+    manifest = {
+        'version': version,
+        'rows': len(ids),
+        'dimension': int(vectors.shape[1]),
+        'attributes': spec['attributes'],
+        'refreshed_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    tmp_manifest = _manifest_path(table, snapshot_dir) + '.tmp'
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_manifest, _manifest_path(table, snapshot_dir))
+
+    # Keep the previous version too: a reader may have read the old manifest but
+    # not mapped its files yet. Processes already mapping a removed version keep
+    # their pages until they re-open.
+    prefix = os.path.join(snapshot_dir, f"{table}.")
+    versions = sorted({path[len(prefix):].split('.', 1)[0]
+                       for path in glob.glob(os.path.join(snapshot_dir, f"{table}.*.npy"))}, key=int)
+    for stale in versions[:-SNAPSHOT_KEEP_VERSIONS]:
+        for path in glob.glob(os.path.join(snapshot_dir, f"{table}.{stale}.*.npy")):
+            os.remove(path)
+
+    return {
+        'rows': len(ids),
+        'changed': len(changed),
+        'removed': len(set(old_rows) - set(int(i) for i in ids)),
+        'seconds': time.perf_counter() - started_at,
+    }
+
+
+class SnapshotSearchBackend:
+    """
+    Exact search over the memory-mapped snapshots. Same methods as
+    SqlSearchBackend; re-opens a table's snapshot when its manifest changes.
+    """
+
+    name = 'exact'
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        self.snapshots = {}
+
+    def snapshot(self, table):
+        manifest = read_manifest(table, self.snapshot_dir)
+        current = self.snapshots.get(table)
+        if current is None or (manifest and manifest['version'] != current.version):
+            self.snapshots[table] = VectorSnapshot(table, self.snapshot_dir)
+        return self.snapshots[table]
+
+    def _search(self, connection, snapshot, query_vector, limit, allowed=None):
+        """Searches the given snapshot, so a mask built from it matches its rows."""
+        ids, distances = snapshot.search(np.asarray(query_vector, dtype=np.float32), limit, allowed=allowed)
+        return hydrate_rows(connection, snapshot.table, ids, distances)
+
+    def products(self, connection, query_vector, limit):
+        print("🔍 Exact search over PRODUCT snapshot...")
+        return self._search(connection, self.snapshot('Products'), query_vector, limit)
+
+    def reviews(self, connection, query_vector, rating_filters, limit):
+        print("🔍 Exact search over REVIEW snapshot...")
+        snapshot = self.snapshot('Reviews')
+        allowed = snapshot.mask('rating', rating_filters) if rating_filters else None
+        return self._search(connection, snapshot, query_vector, limit, allowed=allowed)
+
+    def customers(self, connection, query_vector, limit):
+        print("🔍 Exact search over CUSTOMER snapshot...")
+        return self._search(connection, self.snapshot('Customers'), query_vector, limit)
+
+
+def main():
+    """Refreshes the snapshots of all (or the given) tables."""
+    import pymysql
+    from Milestone4_task3_semantic_search_interface import DB_CONFIG
+
+    tables = sys.argv[1:] or list(ANN_TABLES)
+    print("=" * 70)
+    print("       AetherMart Vector Snapshot Refresh")
+    print("=" * 70)
+
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        for table in tables:
+            stats = refresh_snapshot(connection, table)
+            print(f"✅ {table}: {stats['rows']} rows, {stats['changed']} new/changed, "
+                  f"{stats['removed']} removed ({stats['seconds']:.2f}s)")
+    except Exception as e:
+        print(f"❌ Error refreshing snapshots: {e}")
+        raise
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
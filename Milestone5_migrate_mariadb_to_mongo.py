@@ -1,10 +1,16 @@
 import pymysql
 import pymongo
 import sys
+import os
+import argparse
+import time as _time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, time
 from decimal import Decimal
 import urllib.parse # <-- Add this import
 
+from Milestone5_mongo_indexes import ensure_indexes
+
 # --- Configuration ---
 # !! REPLACE THIS with your new server's Private IP
 MONGO_HOST = "172.31.30.142" 
@@ -22,30 +28,37 @@ MARIA_DB_USER = "alex"
 MARIA_DB_PASS = "alex_pass"
 MARIA_DB_NAME = "aethermart_db"
 
+def open_mariadb():
+    return pymysql.connect(
+        host=MARIA_DB_HOST,
+        user=MARIA_DB_USER,
+        password=MARIA_DB_PASS,
+        database=MARIA_DB_NAME,
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+def open_mongo():
+    """Returns the authenticated aethermart_profiles database (raises on failure)."""
+    # --- CRITICAL FIX HERE: Include authentication in the MongoDB connection URI ---
+    username_quoted = urllib.parse.quote_plus(MONGO_USER)
+    password_quoted = urllib.parse.quote_plus(MONGO_PASS)
+    mongo_uri = f"mongodb://{username_quoted}:{password_quoted}@{MONGO_HOST}:{MONGO_PORT}/?authSource={MONGO_AUTH_DB}"
+
+    mongo_client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    mongo_client.admin.command('ping') # Test connection with auth
+    return mongo_client[MONGO_DB_NAME]
+
 def connect_to_databases():
     """Connects to both MariaDB and MongoDB, returning connection objects."""
     try:
-        maria_conn = pymysql.connect(
-            host=MARIA_DB_HOST,
-            user=MARIA_DB_USER,
-            password=MARIA_DB_PASS,
-            database=MARIA_DB_NAME,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        maria_conn = open_mariadb()
         print("✅ Successfully connected to MariaDB.")
     except Exception as e:
         print(f"❌ FATAL: Error connecting to MariaDB: {e}")
         return None, None
 
     try:
-        # --- CRITICAL FIX HERE: Include authentication in the MongoDB connection URI ---
-        username_quoted = urllib.parse.quote_plus(MONGO_USER)
-        password_quoted = urllib.parse.quote_plus(MONGO_PASS)
-        mongo_uri = f"mongodb://{username_quoted}:{password_quoted}@{MONGO_HOST}:{MONGO_PORT}/?authSource={MONGO_AUTH_DB}"
-        
-        mongo_client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        mongo_client.admin.command('ping') # Test connection with auth
-        mongo_db = mongo_client[MONGO_DB_NAME]
+        mongo_db = open_mongo()
         print(f"✅ Successfully connected to SECURED MongoDB at {MONGO_HOST}.") # Updated message
     except Exception as e:
         print(f"❌ FATAL: Error connecting to MongoDB: {e}")
@@ -58,6 +71,383 @@ def connect_to_databases():
 # --- Rest of your migrate2.py code (migrate_customers, migrate_products, migrate_reviews, main) remains the same ---
 # (You only need to update the connect_to_databases function)
 
+# --- Streaming settings ---
+MIGRATION_CHUNK_SIZE = 5000      # rows per fetchmany() and per insert_many()
+PROGRESS_EVERY_ROWS = 50000      # print a rows/sec line this often
+
+# --- Parallel (key-range sharded) settings ---
+MIGRATION_WORKERS = int(os.environ.get('MIGRATION_WORKERS', 1))   # 1 = sequential, single connection
+RANGES_PER_WORKER = 4            # more ranges than workers keeps the pool busy at the tail
+RANGE_MAX_RETRIES = 3
+
+# --- Shadow-collection swap ---
+SHADOW_SUFFIX = "__new"          # loads go to e.g. product_catalog__new, then renamed over the live one
+MIGRATION_COUNT_TOLERANCE = int(os.environ.get('MIGRATION_COUNT_TOLERANCE', 0))  # rows written during the load
+
+# --- Incremental (watermark) mode ---
+STATE_COLLECTION = "migration_state"   # one {_id: collection, watermark: last primary key} per collection
+
+
+def to_datetime(value):
+    """BSON has no date type: promote DATE values to midnight datetimes."""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time.min)
+    return value
+
+
+def stream_rows(maria_conn, sql, params=None):
+    """
+    Yields rows one by one from an unbuffered server-side cursor
+    (SSDictCursor), so the result set is never held in memory.
+    """
+    with maria_conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(MIGRATION_CHUNK_SIZE)
+            if not rows:
+                break
+            yield from rows
+
+
+def chunked(documents, size=MIGRATION_CHUNK_SIZE):
+    """Groups any iterable into lists of at most `size` items."""
+    chunk = []
+    for doc in documents:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_documents(collection, documents, label, report=True):
+    """
+    LOADS a stream of documents in fixed-size, unordered insert_many()
+    chunks and reports throughput. Returns the number of inserted docs.
+    """
+    started_at = _time.perf_counter()
+    inserted = 0
+    next_report = PROGRESS_EVERY_ROWS
+    for chunk in chunked(documents):
+        result = collection.insert_many(chunk, ordered=False)
+        inserted += len(result.inserted_ids)
+        if report and inserted >= next_report:
+            elapsed = _time.perf_counter() - started_at
+            print(f"   ... {inserted:,} {label} loaded ({inserted / elapsed:,.0f} rows/sec)")
+            next_report += PROGRESS_EVERY_ROWS
+    elapsed = _time.perf_counter() - started_at
+    if report and inserted:
+        print(f"   {inserted:,} {label} in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return inserted
+
+
+def customer_to_document(row):
+    """TRANSFORMS a Customers row into a flexible NoSQL document."""
+    # FIX 2: Clean zipcode data
+    sql_zip = row.get('zipcode')
+    nosql_zip = sql_zip.strip() if sql_zip else None
+
+    return {
+        "customer_id_sql": row['customer_id'],
+        "full_name": f"{row['first_name']} {row['last_name']}",
+        "email": row['email'],
+        "location": {
+            "city": row['city'],
+            "state": row['state'],
+            "zip": nosql_zip
+        },
+        "registration_date": to_datetime(row['registration_date']),  # FIX 1: date -> datetime
+        # ENRICHMENT: Add new fields Maria in Marketing wants
+        "recent_activity_log": [],
+        "customer_preferences": {},
+        "social_media_handles": {}
+    }
+
+
+def product_to_document(row):
+    """TRANSFORMS a Products+Categories row for a flexible catalog."""
+    return {
+        "product_id_sql": row['product_id'],
+        "name": row['product_name'],
+        "price": float(row['price']), # Convert Decimal to float for JSON/BSON
+        "category": row.get('category_name', 'Uncategorized'),
+        # "stock_quantity": row['stock_quantity'],
+        "sql_current_rating": float(row['current_rating']) if row.get('current_rating') else None,
+
+        # ENRICHMENT: The flexible field for specs
+        "specifications": {
+            "note": "Flexible attributes (e.g., 'color', 'wifi_spec', 'consultation_hours') go here."
+        }
+    }
+
+
+def review_to_document(row):
+    """TRANSFORMS a Reviews row into a richer document (media/upvotes)."""
+    return {
+        "review_id_sql": row['review_id'],
+        "product_id_sql": row['product_id'],
+        "customer_id_sql": row['customer_id'],
+        "rating": row['rating'],
+        "review_text": row['review_text'],
+        "review_date": to_datetime(row['review_date']),  # FIX 1: date -> datetime
+
+        # ENRICHMENT: New fields not possible in SQL
+        "media_attachments": [], # Placeholder for image/video URLs
+        "upvotes": 0
+    }
+
+
+# collection -> how to EXTRACT and TRANSFORM it
+MIGRATIONS = {
+    'customer_profiles': {
+        'label': 'customer profiles',
+        'table': 'Customers',
+        'key': 'customer_id',
+        'id_field': 'customer_id_sql',
+        'placeholders': ['recent_activity_log', 'customer_preferences', 'social_media_handles'],
+        'sql': "SELECT * FROM Customers",
+        'transform': customer_to_document,
+    },
+    'product_catalog': {
+        'label': 'products',
+        'table': 'Products',
+        'key': 'p.product_id',
+        'id_field': 'product_id_sql',
+        'placeholders': ['specifications'],
+        # EXTRACT: Join Products and Categories to get the category name
+        'sql': """
+        SELECT p.*, c.category_name
+        FROM Products p
+        LEFT JOIN Categories c ON p.category_id = c.category_id
+        """,
+        'transform': product_to_document,
+    },
+    'reviews': {
+        'label': 'reviews',
+        'table': 'Reviews',
+        'key': 'review_id',
+        'id_field': 'review_id_sql',
+        'placeholders': ['media_attachments', 'upvotes'],
+        'sql': "SELECT * FROM Reviews",
+        'transform': review_to_document,
+    },
+}
+
+
+def source_count(maria_conn, collection_name):
+    with maria_conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS n FROM {MIGRATIONS[collection_name]['table']}")
+        return cursor.fetchone()['n']
+
+
+def prepare_shadow(mongo_db, collection_name):
+    """Returns an empty shadow collection, dropping leftovers of an aborted run."""
+    shadow = mongo_db[collection_name + SHADOW_SUFFIX]
+    shadow.drop()
+    return shadow
+
+
+def swap_in_shadow(mongo_db, collection_name, expected):
+    """
+    Indexes and validates the shadow, then atomically renames it over the
+    live collection (dropTarget). On a count mismatch the live collection
+    is left untouched and the shadow is kept for inspection.
+    """
+    shadow = mongo_db[collection_name + SHADOW_SUFFIX]
+    # Built after the bulk load, and BEFORE going live, so readers never hit an unindexed catalog
+    ensure_indexes(shadow, collection_name)
+    loaded = shadow.count_documents({})
+    if abs(loaded - expected) > MIGRATION_COUNT_TOLERANCE:
+        raise RuntimeError(f"{shadow.name} has {loaded} documents but MariaDB had {expected}; "
+                           f"live '{collection_name}' left unchanged")
+    shadow.rename(collection_name, dropTarget=True)
+    print(f"🔁 Swapped {shadow.name} -> {collection_name} ({loaded} documents validated).")
+
+
+def source_max_key(maria_conn, collection_name):
+    spec = MIGRATIONS[collection_name]
+    key = spec['key'].split('.')[-1]
+    with maria_conn.cursor() as cursor:
+        cursor.execute(f"SELECT MAX({key}) AS hi FROM {spec['table']}")
+        hi = cursor.fetchone()['hi']
+    return int(hi) if hi is not None else 0
+
+
+def get_watermark(mongo_db, collection_name):
+    state = mongo_db[STATE_COLLECTION].find_one({'_id': collection_name})
+    return state['watermark'] if state else 0
+
+
+def set_watermark(mongo_db, collection_name, watermark, rows):
+    mongo_db[STATE_COLLECTION].update_one(
+        {'_id': collection_name},
+        {'$set': {'watermark': watermark, 'last_run_rows': rows, 'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def upsert_documents(mongo_db, collection_name, documents):
+    """
+    LOADS documents as unordered bulk_write() upserts keyed on the SQL id,
+    advancing the watermark after every chunk so an interrupted run resumes
+    where it stopped. Mongo-only placeholder fields are only set on insert,
+    so existing enrichment data is never reset.
+    """
+    spec = MIGRATIONS[collection_name]
+    collection = mongo_db[collection_name]
+    id_field = spec['id_field']
+    started_at = _time.perf_counter()
+    written = 0
+    for chunk in chunked(documents):
+        operations = []
+        for doc in chunk:
+            on_insert = {field: doc.pop(field) for field in spec['placeholders'] if field in doc}
+            update = {'$set': doc}
+            if on_insert:
+                update['$setOnInsert'] = on_insert
+            operations.append(pymongo.UpdateOne({id_field: doc[id_field]}, update, upsert=True))
+        collection.bulk_write(operations, ordered=False)
+        written += len(chunk)
+        set_watermark(mongo_db, collection_name, max(doc[id_field] for doc in chunk), written)
+    elapsed = _time.perf_counter() - started_at
+    if written:
+        print(f"   {written:,} {spec['label']} upserted in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return written
+
+
+def migrate_incremental(maria_conn, mongo_db, collection_name):
+    """
+    Copies only rows whose primary key is beyond the collection's stored
+    watermark. The tables have no updated-at column, so this picks up new
+    rows; changes to existing rows are the sync worker's job.
+    """
+    spec = MIGRATIONS[collection_name]
+    watermark = get_watermark(mongo_db, collection_name)
+    print(f"\n--- Incremental {spec['label']}: {spec['key']} > {watermark} ---")
+    ensure_indexes(mongo_db[collection_name], collection_name)  # the upserts filter on the SQL id
+    rows = stream_rows(maria_conn, f"{spec['sql']} WHERE {spec['key']} > %s ORDER BY {spec['key']}", (watermark,))
+    written = upsert_documents(mongo_db, collection_name, (spec['transform'](row) for row in rows))
+    if not written:
+        print(f"✅ {spec['label']} already up to date.")
+    return written
+
+
+def migrate_collection(maria_conn, mongo_db, collection_name):
+    """
+    Streams one table through its transform into a shadow collection and
+    swaps it in; readers of the live collection never see a partial load.
+    """
+    spec = MIGRATIONS[collection_name]
+    expected = source_count(maria_conn, collection_name)
+    watermark = source_max_key(maria_conn, collection_name)  # later rows are re-upserted, never missed
+    rows = stream_rows(maria_conn, spec['sql'])
+    documents = (spec['transform'](row) for row in rows)
+
+    # LOAD: into the shadow; the old data is dropped by the rename
+    shadow = prepare_shadow(mongo_db, collection_name)
+    inserted = load_documents(shadow, documents, spec['label'])
+    if inserted:
+        print(f"✅ LOAD complete: Successfully inserted {inserted} {spec['label']}.")
+    else:
+        print(f"⚠️ No {spec['label']} found to migrate.")
+    swap_in_shadow(mongo_db, collection_name, expected)
+    set_watermark(mongo_db, collection_name, watermark, inserted)
+    return inserted
+
+
+def key_ranges(maria_conn, collection_name, count):
+    """Splits the table's primary-key span into `count` inclusive [lo, hi] ranges."""
+    spec = MIGRATIONS[collection_name]
+    key = spec['key'].split('.')[-1]
+    with maria_conn.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({key}) AS lo, MAX({key}) AS hi FROM {spec['table']}")
+        bounds = cursor.fetchone()
+    if bounds['lo'] is None:
+        return []
+    lo, hi = int(bounds['lo']), int(bounds['hi'])
+    step = max(1, -(-(hi - lo + 1) // count))
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+def migrate_range(collection_name, lo, hi):
+    """
+    Worker task: migrates one key range over its OWN MariaDB and Mongo
+    connections. A failed attempt clears what it wrote for the range
+    before retrying, so retries never duplicate documents.
+    """
+    spec = MIGRATIONS[collection_name]
+    for attempt in range(1, RANGE_MAX_RETRIES + 1):
+        maria_conn = mongo_db = None
+        try:
+            maria_conn = open_mariadb()
+            mongo_db = open_mongo()
+            collection = mongo_db[collection_name + SHADOW_SUFFIX]
+            if attempt > 1:
+                collection.delete_many({spec['id_field']: {'$gte': lo, '$lte': hi}})
+            rows = stream_rows(maria_conn, f"{spec['sql']} WHERE {spec['key']} BETWEEN %s AND %s", (lo, hi))
+            documents = (spec['transform'](row) for row in rows)
+            return load_documents(collection, documents, spec['label'], report=False)
+        except Exception as e:
+            print(f"⚠️ {collection_name} [{lo}-{hi}] attempt {attempt}/{RANGE_MAX_RETRIES} failed: {e}")
+            if attempt == RANGE_MAX_RETRIES:
+                raise
+            _time.sleep(2 ** attempt)
+        finally:
+            if maria_conn is not None:
+                maria_conn.close()
+            if mongo_db is not None:
+                mongo_db.client.close()
+
+
+def migrate_parallel(maria_conn, mongo_db, workers, collection_names=None):
+    """
+    Migrates all collections at once: every table is split into key ranges
+    and all ranges share one pool of `workers` threads, loading shadow
+    collections. Collections whose ranges all succeeded are swapped in.
+    Returns {collection: inserted} and the list of ranges that failed for good.
+    """
+    collection_names = collection_names or list(MIGRATIONS)
+    tasks = []
+    expected = {}
+    watermarks = {}
+    for name in collection_names:
+        prepare_shadow(mongo_db, name)
+        expected[name] = source_count(maria_conn, name)
+        watermarks[name] = source_max_key(maria_conn, name)
+        tasks += [(name, lo, hi) for lo, hi in key_ranges(maria_conn, name, workers * RANGES_PER_WORKER)]
+    print(f"\n--- Parallel Migration: {len(tasks)} key ranges across {workers} workers ---")
+
+    started_at = _time.perf_counter()
+    inserted = {name: 0 for name in collection_names}
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='migrate') as pool:
+        futures = {pool.submit(migrate_range, *task): task for task in tasks}
+        for future in as_completed(futures):
+            name, lo, hi = futures[future]
+            try:
+                inserted[name] += future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"❌ ERROR: {name} [{lo}-{hi}] gave up: {e}")
+
+    elapsed = _time.perf_counter() - started_at
+    total = sum(inserted.values())
+    print(f"   {total:,} documents in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/sec)")
+    for name in collection_names:
+        if any(task[0] == name for task in failed):
+            print(f"❌ {name}: not swapped in (failed ranges); live collection unchanged.")
+            continue
+        print(f"✅ LOAD complete: Successfully inserted {inserted[name]} {MIGRATIONS[name]['label']}.")
+        try:
+            swap_in_shadow(mongo_db, name, expected[name])
+            set_watermark(mongo_db, name, watermarks[name], inserted[name])
+        except Exception as e:
+            failed.append((name, None, None))
+            print(f"❌ ERROR: {e}")
+    return inserted, failed
+
+
 def migrate_customers(maria_conn, mongo_db):
     """
     EXTRACTS Customers from MariaDB.
@@ -66,50 +456,7 @@ def migrate_customers(maria_conn, mongo_db):
     """
     print("\n--- Starting Customer Migration ---")
     try:
-        with maria_conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM Customers")
-            all_customers = cursor.fetchall()
-        
-        customer_documents = []
-        for row in all_customers:
-            # FIX 1: Convert date to datetime
-            sql_reg_date = row['registration_date']
-            nosql_reg_date = sql_reg_date
-            if isinstance(sql_reg_date, date) and not isinstance(sql_reg_date, datetime):
-                nosql_reg_date = datetime.combine(sql_reg_date, time.min)
-            
-            # FIX 2: Clean zipcode data
-            sql_zip = row.get('zipcode')
-            nosql_zip = sql_zip.strip() if sql_zip else None
-            
-            # TRANSFORM: Build the rich document
-            doc = {
-                "customer_id_sql": row['customer_id'],
-                "full_name": f"{row['first_name']} {row['last_name']}",
-                "email": row['email'],
-                "location": {
-                    "city": row['city'],
-                    "state": row['state'],
-                    "zip": nosql_zip
-                },
-                "registration_date": nosql_reg_date,
-                # ENRICHMENT: Add new fields Maria in Marketing wants
-                "recent_activity_log": [],
-                "customer_preferences": {},
-                "social_media_handles": {}
-            }
-            customer_documents.append(doc)
-        
-        if customer_documents:
-            print(f"Transform complete: {len(customer_documents)} documents prepared.")
-            # LOAD: Clear old data and insert new
-            collection = mongo_db['customer_profiles']
-            collection.delete_many({}) # Clear for a clean run
-            result = collection.insert_many(customer_documents)
-            print(f"✅ LOAD complete: Successfully inserted {len(result.inserted_ids)} customer profiles.")
-        else:
-            print("⚠️ No customers found to migrate.")
-            
+        migrate_collection(maria_conn, mongo_db, 'customer_profiles')
     except Exception as e:
         print(f"❌ ERROR during customer migration: {e}")
 
@@ -121,44 +468,7 @@ def migrate_products(maria_conn, mongo_db):
     """
     print("\n--- Starting Product Migration ---")
     try:
-        # EXTRACT: Join Products and Categories to get the category name
-        sql = """
-        SELECT p.*, c.category_name 
-        FROM Products p
-        LEFT JOIN Categories c ON p.category_id = c.category_id
-        """
-        with maria_conn.cursor() as cursor:
-            cursor.execute(sql)
-            all_products = cursor.fetchall()
-        
-        product_documents = []
-        for row in all_products:
-            # TRANSFORM: Build the flexible document for Sarah (Product)
-            doc = {
-                "product_id_sql": row['product_id'],
-                "name": row['product_name'],
-                "price": float(row['price']), # Convert Decimal to float for JSON/BSON
-                "category": row.get('category_name', 'Uncategorized'),
-                # "stock_quantity": row['stock_quantity'],
-                "sql_current_rating": float(row['current_rating']) if row.get('current_rating') else None,
-                
-                # ENRICHMENT: The flexible field for specs
-                "specifications": {
-                    "note": "Flexible attributes (e.g., 'color', 'wifi_spec', 'consultation_hours') go here."
-                }
-            }
-            product_documents.append(doc)
-            
-        if product_documents:
-            print(f"Transform complete: {len(product_documents)} documents prepared.")
-            # LOAD: Clear old data and insert new
-            collection = mongo_db['product_catalog']
-            collection.delete_many({})
-            result = collection.insert_many(product_documents)
-            print(f"✅ LOAD complete: Successfully inserted {len(result.inserted_ids)} products.")
-        else:
-            print("⚠️ No products found to migrate.")
-
+        migrate_collection(maria_conn, mongo_db, 'product_catalog')
     except Exception as e:
         print(f"❌ ERROR during product migration: {e}")
 
@@ -170,48 +480,19 @@ def migrate_reviews(maria_conn, mongo_db):
     """
     print("\n--- Starting Review Migration ---")
     try:
-        with maria_conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM Reviews")
-            all_reviews = cursor.fetchall()
-            
-        review_documents = []
-        for row in all_reviews:
-            # FIX 1: Convert date to datetime
-            sql_review_date = row['review_date']
-            nosql_review_date = sql_review_date
-            if isinstance(sql_review_date, date) and not isinstance(sql_review_date, datetime):
-                nosql_review_date = datetime.combine(sql_review_date, time.min)
-                
-            # TRANSFORM: Build the richer review document
-            doc = {
-                "review_id_sql": row['review_id'],
-                "product_id_sql": row['product_id'],
-                "customer_id_sql": row['customer_id'],
-                "rating": row['rating'],
-                "review_text": row['review_text'],
-                "review_date": nosql_review_date,
-                
-                # ENRICHMENT: New fields not possible in SQL
-                "media_attachments": [], # Placeholder for image/video URLs
-                "upvotes": 0
-            }
-            review_documents.append(doc)
-            
-        if review_documents:
-            print(f"Transform complete: {len(review_documents)} documents prepared.")
-            # LOAD: Clear old data and insert new
-            collection = mongo_db['reviews']
-            collection.delete_many({})
-            result = collection.insert_many(review_documents)
-            print(f"✅ LOAD complete: Successfully inserted {len(result.inserted_ids)} reviews.")
-        else:
-            print("⚠️ No reviews found to migrate.")
-
+        migrate_collection(maria_conn, mongo_db, 'reviews')
     except Exception as e:
         print(f"❌ ERROR during review migration: {e}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="MariaDB -> MongoDB migration.")
+    parser.add_argument('--workers', type=int, default=MIGRATION_WORKERS,
+                        help="parallel key-range workers (1 = sequential)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only copy rows beyond each collection's stored watermark (upserts)")
+    args = parser.parse_args()
+
     print("Starting Hybrid Data Integration (MariaDB -> MongoDB)...")
     maria_conn, mongo_db = connect_to_databases()
     
@@ -220,11 +501,20 @@ def main():
         return
 
     try:
-        # Run the ETL for each part
-        migrate_customers(maria_conn, mongo_db)
-        migrate_products(maria_conn, mongo_db)
-        migrate_reviews(maria_conn, mongo_db)
-        
+        if args.incremental:
+            for name in MIGRATIONS:
+                migrate_incremental(maria_conn, mongo_db, name)
+        elif args.workers > 1:
+            _, failed = migrate_parallel(maria_conn, mongo_db, args.workers)
+            if failed:
+                print(f"❌ {len(failed)} key range(s) or swap(s) failed; re-run the migration.")
+                sys.exit(1)
+        else:
+            # Run the ETL for each part
+            migrate_customers(maria_conn, mongo_db)
+            migrate_products(maria_conn, mongo_db)
+            migrate_reviews(maria_conn, mongo_db)
+
         print("\n🎉 Hybrid Integration Script Finished Successfully! 🎉")
         
     except Exception as e:
@@ -0,0 +1,73 @@
+import sys
+import time
+
+import pymongo
+from pymongo import ASCENDING, IndexModel
+
+# --- Index declarations (shared by the migration and the sync worker) ---
+# The unique *_id_sql indexes back every sync upsert ({<id>_sql: id}); without
+# them each update_one is a collection scan. The rest serve common reads.
+MONGO_INDEXES = {
+    "customer_profiles": [
+        IndexModel([("customer_id_sql", ASCENDING)], unique=True, name="uniq_customer_id_sql"),
+    ],
+    "product_catalog": [
+        IndexModel([("product_id_sql", ASCENDING)], unique=True, name="uniq_product_id_sql"),
+        IndexModel([("category", ASCENDING)], name="idx_category"),
+    ],
+    "reviews": [
+        IndexModel([("review_id_sql", ASCENDING)], unique=True, name="uniq_review_id_sql"),
+        IndexModel([("product_id_sql", ASCENDING)], name="idx_product_id_sql"),
+        IndexModel([("review_date", ASCENDING)], name="idx_review_date"),
+    ],
+}
+
+
+def ensure_indexes(collection, collection_name=None, verbose=True):
+    """
+    Creates the declared indexes of `collection_name` on `collection` (which
+    may be a shadow such as product_catalog__new). Existing indexes are a
+    no-op, so this is safe to call on every run. Call it AFTER a bulk load:
+    one build over loaded data is much cheaper than maintaining the index
+    on every insert. Returns {index name: seconds}.
+    """
+    timings = {}
+    for index in MONGO_INDEXES.get(collection_name or collection.name, []):
+        name = index.document["name"]
+        started_at = time.perf_counter()
+        collection.create_indexes([index])
+        timings[name] = time.perf_counter() - started_at
+        if verbose:
+            print(f"   🗂️  {collection.name}.{name} ready in {timings[name]:.2f}s")
+    return timings
+
+
+def has_unique_index(collection, field):
+    """True when `field` alone is covered by a unique index on `collection`."""
+    return any(info.get('unique') and [key for key, _ in info['key']] == [field]
+               for info in collection.index_information().values())
+
+
+def ensure_all_indexes(mongo_db, verbose=True):
+    """Ensures the indexes of every declared collection; returns {collection: {index: seconds}}."""
+    return {name: ensure_indexes(mongo_db[name], name, verbose) for name in MONGO_INDEXES}
+
+
+if __name__ == "__main__":
+    from Milestone5_migrate_mariadb_to_mongo import open_mongo
+
+    print("Ensuring MongoDB indexes...")
+    try:
+        mongo_db = open_mongo()
+    except Exception as e:
+        print(f"❌ FATAL: Error connecting to MongoDB: {e}")
+        sys.exit(1)
+    try:
+        timings = ensure_all_indexes(mongo_db)
+        total = sum(sum(t.values()) for t in timings.values())
+        print(f"✅ {sum(len(t) for t in timings.values())} indexes ensured in {total:.2f}s.")
+    except pymongo.errors.PyMongoError as e:
+        print(f"❌ Index build failed: {e}")
+        sys.exit(1)
+    finally:
+        mongo_db.client.close()
@@ -0,0 +1,300 @@
+"""
+AetherMart M6: Binlog-based Change Data Capture (optional CDC source)
+
+Tails the MariaDB row-based binlog instead of the trigger-fed *_sync_queue
+tables and applies the same change records to MongoDB through the sync
+worker's mapping (build_update_doc / coalesce_jobs / apply_jobs). Unlike
+the triggers it adds no extra INSERT to OLTP writes on Products, Customers
+and Reviews, and it also captures DELETEs.
+
+Requirements:
+    pip install mysql-replication
+    MariaDB: log_bin=ON, binlog_format=ROW, binlog_row_image=FULL
+    Grants / trigger switch-over: see Milestone6_binlog_cdc.sql
+
+Run (instead of Milestone6_mongo_sync_worker.py --daemon):
+    python3 Milestone6_binlog_cdc.py
+The binlog position is checkpointed in MongoDB (sync_state) after every
+applied batch, so a restart resumes without gaps; replaying a batch is
+harmless because every apply is an idempotent upsert/delete.
+
+Switching back to the trigger-fed queues (stop this process first):
+    python3 Milestone6_binlog_cdc.py --switch-to-triggers
+then re-apply Milestone6_sync2.sql and start the sync worker.
+"""
+import argparse
+import logging
+import os
+import signal
+import time
+
+from Milestone6_mongo_sync_worker import (
+    MARIA_DB_HOST, MARIA_DB_NAME, MARIA_DB_PASS, MARIA_DB_USER, MONGO_DB_NAME,
+    SYNC_BATCH_SIZE, SYNC_JOBS, apply_jobs, coalesce_jobs, get_maria_connection, get_mongo_client,
+    guard_index_ready
+)
+
+# --- CONFIGURATION ---
+CDC_SERVER_ID = int(os.environ.get('CDC_SERVER_ID', 4242))   # must be unique among replicas
+CDC_FLUSH_INTERVAL = 0.2      # seconds: apply a partial batch at least this often
+CDC_HEARTBEAT = 1.0           # seconds: server heartbeat so idle streams still flush/stop
+CDC_STATE_COLLECTION = "sync_state"
+CDC_STATE_ID = "binlog_cdc"
+
+# Source table -> the sync job describing its queue mapping
+CDC_TABLES = {
+    "Products": SYNC_JOBS[0],
+    "Customers": SYNC_JOBS[1],
+    "Reviews": SYNC_JOBS[2],
+}
+
+
+def load_replication():
+    """Imports pymysqlreplication lazily: it is only needed for this CDC source."""
+    try:
+        from pymysqlreplication import BinLogStreamReader
+        from pymysqlreplication.event import HeartbeatLogEvent, XidEvent
+        from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent, WriteRowsEvent
+    except ImportError:
+        raise SystemExit("❌ Binlog CDC needs the 'mysql-replication' package (pip install mysql-replication).")
+    return BinLogStreamReader, HeartbeatLogEvent, XidEvent, (WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent)
+
+
+def change_sequence(log_file, log_pos, row_index):
+    """
+    Monotonic number for a row change, used where the queue rows use
+    queue_id (coalescing and the last_sync_queue_id guard). Binlog
+    positions are far above any trigger-era queue_id, so switching from
+    triggers to CDC never makes a newer change look stale. The reverse is
+    not true: CDC-stamped documents would reject every later queue_id,
+    which is why switching back must run reset_sync_guards() first.
+    """
+    file_number = int(log_file.rsplit('.', 1)[-1])
+    return file_number * 10**13 + log_pos * 1000 + row_index
+
+
+def reset_sync_guards(mongo_db):
+    """
+    Switch-back step (CDC -> triggers): removes the binlog-sized
+    last_sync_queue_id stamps so trigger queue_ids pass the apply guard
+    again, and forgets the binlog checkpoint so a later switch to CDC
+    starts at the current end of the binlog instead of replaying old changes.
+    """
+    for job in CDC_TABLES.values():
+        result = mongo_db[job["mongo_collection"]].update_many(
+            {'last_sync_queue_id': {'$exists': True}},
+            {'$unset': {'last_sync_queue_id': ""}}
+        )
+        print(f"✅ {job['mongo_collection']}: cleared last_sync_queue_id on {result.modified_count} documents")
+    mongo_db[CDC_STATE_COLLECTION].delete_one({'_id': CDC_STATE_ID})
+    print(f"✅ Binlog checkpoint removed; re-apply Milestone6_sync2.sql and start the sync worker.")
+
+
+def to_change_record(table, op, values, sequence):
+    """Shapes a binlog row like a *_sync_queue row (plus 'op') for the sync worker."""
+    record = dict(values)
+    record['queue_id'] = sequence
+    record['op'] = op
+    return record
+
+
+def fields_changed(job, before, after):
+    """Same test as the trg_after_*_update triggers: only synced columns count."""
+    return any(before.get(field) != after.get(field) for field in job["data_fields"])
+
+
+class BinlogCDC:
+    """Streams row events, batches them and applies them to MongoDB."""
+
+    def __init__(self):
+        self.running = True
+        self.mongo_client = None
+        self.mongo_db = None
+        self.open_txn = []            # (table, change record) of the transaction being read
+        self.pending = []             # committed changes waiting to be applied
+        self.position = None          # (log_file, log_pos) after the last buffered COMMIT
+        self.stats = {'upserts': 0, 'deletes': 0, 'coalesced': 0, 'batches': 0}
+
+    def stop(self, signum=None, frame=None):
+        print("\n🛑 Shutdown requested; flushing the current batch...")
+        self.running = False
+
+    # --- checkpointing ---
+    def load_checkpoint(self):
+        state = self.mongo_db[CDC_STATE_COLLECTION].find_one({'_id': CDC_STATE_ID})
+        if state:
+            return state['log_file'], state['log_pos']
+        # First run: start at the current end of the binlog (the initial migration covers the past)
+        maria_conn = get_maria_connection()
+        try:
+            with maria_conn.cursor() as cursor:
+                cursor.execute("SHOW MASTER STATUS")
+                status = cursor.fetchone()
+            return status['File'], status['Position']
+        finally:
+            maria_conn.close()
+
+    def save_checkpoint(self):
+        log_file, log_pos = self.position
+        self.mongo_db[CDC_STATE_COLLECTION].update_one(
+            {'_id': CDC_STATE_ID},
+            {'$set': {'log_file': log_file, 'log_pos': log_pos, 'updated_at': time.time()}},
+            upsert=True
+        )
+
+    # --- applying ---
+    def flush(self):
+        """Applies the buffered changes table by table, then checkpoints."""
+        if not self.pending:
+            return
+        by_table = {}
+        for table, record in self.pending:
+            by_table.setdefault(table, []).append(record)
+
+        for table, records in by_table.items():
+            job = CDC_TABLES[table]
+            mongo_coll = self.mongo_db[job["mongo_collection"]]
+            latest, superseded = coalesce_jobs(records, job["id_field"])
+            upserts = [r for r in latest if r['op'] != 'delete']
+            deletes = [r[job["id_field"]] for r in latest if r['op'] == 'delete']
+
+            if upserts:
+                _, failed = apply_jobs(mongo_coll, job["queue_table"], upserts,
+                                       job["id_field"], job["mongo_id_field"])
+                if failed:
+                    # Do not advance the checkpoint: the batch is replayed after a restart
+                    raise RuntimeError(f"{len(failed)} {table} changes failed to apply")
+            if deletes:
+                mongo_coll.delete_many({job["mongo_id_field"]: {'$in': deletes}})
+            self.stats['upserts'] += len(upserts)
+            self.stats['deletes'] += len(deletes)
+            self.stats['coalesced'] += len(superseded)
+
+        self.save_checkpoint()
+        self.stats['batches'] += 1
+        print(f"✅ Applied {len(self.pending)} binlog changes "
+              f"({', '.join(f'{t}: {len(r)}' for t, r in by_table.items())}) up to {self.position[0]}:{self.position[1]}")
+        self.pending = []
+
+    def buffer_rows(self, event, log_file, log_pos, row_event_types):
+        write_type, update_type, delete_type = row_event_types
+        table = event.table
+        job = CDC_TABLES[table]
+        for index, row in enumerate(event.rows):
+            sequence = change_sequence(log_file, log_pos, index)
+            if isinstance(event, update_type):
+                if not fields_changed(job, row['before_values'], row['after_values']):
+                    continue
+                record = to_change_record(table, 'upsert', row['after_values'], sequence)
+            elif isinstance(event, delete_type):
+                record = to_change_record(table, 'delete', row['values'], sequence)
+            else:
+                record = to_change_record(table, 'upsert', row['values'], sequence)
+            self.open_txn.append((table, record))
+
+    def commit(self, log_file, log_pos):
+        """
+        Transaction boundary: its changes become applicable, and this is the
+        only kind of position we checkpoint (resuming mid-transaction would
+        land between a table map and its row events).
+        """
+        self.pending.extend(self.open_txn)
+        self.open_txn = []
+        self.position = (log_file, log_pos)
+
+    # --- main loop ---
+    def stream(self):
+        BinLogStreamReader, HeartbeatLogEvent, XidEvent, row_event_types = load_replication()
+        log_file, log_pos = self.load_checkpoint()
+        self.position = (log_file, log_pos)
+        print(f"📡 Tailing binlog from {log_file}:{log_pos} ({', '.join(CDC_TABLES)})")
+
+        reader = BinLogStreamReader(
+            connection_settings={'host': MARIA_DB_HOST, 'port': 3306,
+                                 'user': MARIA_DB_USER, 'passwd': MARIA_DB_PASS},
+            server_id=CDC_SERVER_ID,
+            log_file=log_file,
+            log_pos=log_pos,
+            resume_stream=True,
+            blocking=True,
+            slave_heartbeat=CDC_HEARTBEAT,
+            only_schemas=[MARIA_DB_NAME],
+            only_tables=list(CDC_TABLES),
+            only_events=[*row_event_types, XidEvent, HeartbeatLogEvent],
+        )
+        last_flush = time.monotonic()
+        try:
+            for event in reader:
+                if isinstance(event, XidEvent):
+                    self.commit(reader.log_file, reader.log_pos)
+                elif not isinstance(event, HeartbeatLogEvent):
+                    self.buffer_rows(event, reader.log_file, reader.log_pos, row_event_types)
+                    continue
+                if (len(self.pending) >= SYNC_BATCH_SIZE
+                        or time.monotonic() - last_flush >= CDC_FLUSH_INTERVAL
+                        or not self.running):
+                    self.flush()
+                    last_flush = time.monotonic()
+                if not self.running:
+                    break
+        finally:
+            reader.close()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.mongo_client = get_mongo_client()
+        if self.mongo_client is None:
+            print("❌ Could not connect to MongoDB.")
+            return
+        self.mongo_db = self.mongo_client[MONGO_DB_NAME]
+        # One binlog position covers every table, so a collection cannot be
+        # skipped on its own: without its unique guard index, do not start.
+        missing = [job["mongo_collection"] for job in CDC_TABLES.values()
+                   if not guard_index_ready(self.mongo_db[job["mongo_collection"]],
+                                            job["mongo_collection"], job["mongo_id_field"])]
+        if missing:
+            print(f"❌ No unique sync index on {', '.join(missing)}; run Milestone5_mongo_indexes.py first.")
+            self.mongo_client.close()
+            return
+
+        logging.info("Binlog CDC started")
+        try:
+            while self.running:
+                try:
+                    self.stream()
+                except SystemExit:
+                    raise
+                except Exception as e:
+                    # Replay from the last checkpoint after a short pause
+                    logging.error(f"Binlog CDC error: {e}")
+                    print(f"❌ CDC error: {e}; resuming from the last checkpoint...")
+                    self.open_txn, self.pending = [], []
+                    time.sleep(2)
+        finally:
+            self.mongo_client.close()
+            logging.info(f"Binlog CDC stopped: {self.stats}")
+            print(f"Binlog CDC stopped. {self.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binlog CDC source for the Mongo sync.")
+    parser.add_argument('--switch-to-triggers', action='store_true',
+                        help="reset the sync guards for the trigger-based worker, then exit")
+    args = parser.parse_args()
+
+    if args.switch_to_triggers:
+        mongo_client = get_mongo_client()
+        if mongo_client is None:
+            print("❌ Could not connect to MongoDB.")
+            return
+        try:
+            reset_sync_guards(mongo_client[MONGO_DB_NAME])
+        finally:
+            mongo_client.close()
+        return
+    BinlogCDC().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+-- ============================================================
+-- AetherMart M6: Switch real-time sync from triggers to binlog CDC
+-- Use together with Milestone6_binlog_cdc.py
+-- ============================================================
+
+-- 1. Server settings (my.cnf, [mariadb] section; restart required):
+--      log_bin           = mariadb-bin
+--      binlog_format     = ROW
+--      binlog_row_image  = FULL
+--      binlog_row_metadata = FULL      -- column names in the binlog (MariaDB 10.5+)
+--    On a Galera node also keep log_slave_updates = ON so every node's
+--    writes reach the binlog the CDC process reads.
+
+-- 2. The CDC process reads the binlog as a replica does
+GRANT REPLICATION SLAVE, REPLICATION CLIENT ON *.* TO 'alex'@'localhost';
+FLUSH PRIVILEGES;
+
+-- 3. Stop the trigger-based enqueueing (the OLTP writes lose the extra INSERT).
+--    Drain the *_sync_queue tables with the sync worker FIRST, then drop the
+--    triggers and start Milestone6_binlog_cdc.py.
+USE aethermart_db;
+
+DROP TRIGGER IF EXISTS trg_after_product_insert;
+DROP TRIGGER IF EXISTS trg_after_product_update;
+DROP TRIGGER IF EXISTS trg_after_customer_insert;
+DROP TRIGGER IF EXISTS trg_after_customer_update;
+DROP TRIGGER IF EXISTS trg_after_review_insert;
+DROP TRIGGER IF EXISTS trg_after_review_update;
+
+-- 4. To go back to trigger-based sync:
+--    a) stop Milestone6_binlog_cdc.py;
+--    b) python3 Milestone6_binlog_cdc.py --switch-to-triggers
+--       (CDC stamps last_sync_queue_id with binlog positions, ~10^13 and up;
+--       until they are cleared every trigger queue_id looks stale and its
+--       change is dropped as already applied);
+--    c) re-apply Milestone6_sync2.sql and start the sync worker.
+--    Changes made between a) and c) are not captured by either source: keep
+--    writes stopped, or re-run the migration afterwards.
@@ -3,9 +3,19 @@ import pymongo
 import sys
 import time
 import logging
+import os
+import socket
+import signal
+import threading
 import urllib.parse
 from datetime import datetime, date
 import decimal
+from pymongo.errors import BulkWriteError
+
+from Milestone5_mongo_indexes import ensure_indexes, has_unique_index
+from Milestone6_sync_metrics import (
+    SYNC_METRICS_FILE, SYNC_METRICS_INTERVAL, SyncMetrics, start_metrics_server
+)
 
 # --- CONFIGURATION ---
 MONGO_HOST = "172.31.30.142" 
@@ -23,6 +33,26 @@ MARIA_DB_USER = "alex"
 MARIA_DB_PASS = "alex_pass"
 MARIA_DB_NAME = "aethermart_db"
 
+# --- BATCHING ---
+SYNC_BATCH_SIZE = 1000   # queue rows per bulk_write / status UPDATE
+
+# --- LEASING (several workers may drain the same queues) ---
+WORKER_ID = os.environ.get('SYNC_WORKER_ID') or f"{socket.gethostname()}:{os.getpid()}"
+SYNC_LEASE_SECONDS = 60   # a claimed batch not finished by then is reclaimed by any worker
+
+# --- RETRIES ---
+SYNC_MAX_ATTEMPTS = 6             # after this many failures a job goes to sync_dead_letter
+SYNC_RETRY_BASE_SECONDS = 5       # backoff: 5s, 10s, 20s, ... capped below
+SYNC_RETRY_MAX_SECONDS = 900
+
+# --- DAEMON MODE (python3 Milestone6_mongo_sync_worker.py --daemon) ---
+POLL_MIN_INTERVAL = 0.05     # seconds between polls while there is work
+POLL_MAX_INTERVAL = 2.0      # ceiling the interval backs off to when the queues are idle
+INDEX_RETRY_INTERVAL = 30.0  # seconds between checks for a missing unique guard index
+
+# --- METRICS (see Milestone6_sync_metrics.py) ---
+METRICS = SyncMetrics()
+
 # --- LOGGING ---
 LOG_FILE = "realtime_sync.log"
 logging.basicConfig(
@@ -42,146 +72,538 @@ def get_maria_connection():
         logging.error(f"Error connecting to MariaDB: {e}")
         return None
 
-def get_mongo_collection(collection_name):
+def get_mongo_client():
     try:
         username = urllib.parse.quote_plus(MONGO_USER)
         password = urllib.parse.quote_plus(MONGO_PASS)
         mongo_uri = f"mongodb://{username}:{password}@{MONGO_HOST}:{MONGO_PORT}/?authSource={MONGO_AUTH_DB}"
-        client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        return client[MONGO_DB_NAME][collection_name]
+        return pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
     except Exception as e:
         logging.error(f"Error connecting to MongoDB: {e}")
         return None
 
+def get_mongo_collection(collection_name):
+    client = get_mongo_client()
+    return client[MONGO_DB_NAME][collection_name] if client is not None else None
+
 def clean_value(value):
     """Helper to strip whitespace/newlines from strings."""
     if isinstance(value, str):
         return value.strip()
     return value
 
-def process_queue(queue_table, mongo_collection_name, id_field, mongo_id_field, data_fields):
-    maria_conn = get_maria_connection()
-    mongo_coll = get_mongo_collection(mongo_collection_name)
+def build_update_doc(queue_table, job, id_field, mongo_id_field):
+    """Maps one queue row onto the $set document for its MongoDB collection."""
+    item_id = job[id_field]
 
-    if maria_conn is None or mongo_coll is None:
-        print(f"❌ Connection failed for {queue_table}")
-        return
+    # The document to set, starting with the SQL ID for identification
+    # We will build this carefully based on existing MongoDB schema from migrate.py
+    update_set_doc = {
+        mongo_id_field: item_id, # Ensure the identifying field is always present
+        "last_synced_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    # --- Specific Mapping Logic based on your MongoDB Schema from migrate.py ---
+    if queue_table == "customer_sync_queue":
+        # Map MariaDB first_name, last_name to MongoDB full_name
+        first_name = clean_value(job.get("first_name", ""))
+        last_name = clean_value(job.get("last_name", ""))
+        update_set_doc["full_name"] = f"{first_name} {last_name}".strip()
+
+        # Map MariaDB city, state, zipcode to MongoDB location sub-document
+        update_set_doc["location.city"] = clean_value(job.get("city"))
+        update_set_doc["location.state"] = clean_value(job.get("state"))
+        update_set_doc["location.zip"] = clean_value(job.get("zipcode")) # Assuming 'zip' key for zipcode in location
+
+        # Map other direct fields
+        update_set_doc["email"] = clean_value(job.get("email"))
+        # Note: registration_date is typically set once during initial migration,
+        # not updated by the sync queue unless you specifically want to sync it.
+        # customer_preferences, social_media_handles, recent_activity_log are also generally not updated here.
+
+    elif queue_table == "product_sync_queue":
+        # Map MariaDB fields directly to MongoDB fields for products
+        update_set_doc["name"] = clean_value(job.get("product_name")) # Mapping to 'name' as per your migrate.py
+        update_set_doc["price"] = float(job.get("price")) if job.get("price") is not None else 0.0
+        # If 'category' can change, you'd add it here if category_name is in your product_sync_queue
+        # update_set_doc["category"] = clean_value(job.get("category_name")) # If category_name is in queue
+
+    elif queue_table == "review_sync_queue":
+        # Map MariaDB fields directly to MongoDB fields for reviews
+        update_set_doc["customer_id_sql"] = job.get("customer_id") # Direct ID from MariaDB, keeping _sql suffix
+        update_set_doc["product_id_sql"] = job.get("product_id") # Direct ID from MariaDB, keeping _sql suffix
+        update_set_doc["rating"] = float(job.get("rating")) if job.get("rating") is not None else 0.0
+        update_set_doc["review_text"] = clean_value(job.get("review_text"))
+        # Convert date to ISODate string format if that's what migrate.py did
+        review_date_val = job.get("review_date")
+        if isinstance(review_date_val, (datetime, date)):
+            update_set_doc["review_date"] = review_date_val.isoformat() # or .strftime('%Y-%m-%d')
+        else:
+            update_set_doc["review_date"] = review_date_val
 
+    return update_set_doc
+
+def apply_jobs(mongo_coll, queue_table, jobs, id_field, mongo_id_field, errors=None):
+    """
+    Applies a page of queue rows with ONE bulk_write.
+    Returns (completed queue_ids, failed queue_ids); per-operation errors
+    from the bulk result only fail their own rows. Rows not in either list
+    were not attempted. If `errors` is a dict it receives queue_id -> message
+    for the failed rows.
+
+    Each write is guarded by last_sync_queue_id, so when two workers hold
+    changes to the same entity the older one can never overwrite the newer:
+    the guarded upsert then hits the unique *_id_sql index instead, which
+    counts as done (a newer image is already in place).
+    """
+    operations = []
+    for job in jobs:
+        update_set_doc = build_update_doc(queue_table, job, id_field, mongo_id_field)
+        update_set_doc["last_sync_queue_id"] = job['queue_id']
+        operations.append(pymongo.UpdateOne(
+            # Filter by the mongo_id_field (e.g., customer_id_sql); $set keeps the rest of the document
+            {mongo_id_field: job[id_field],
+             "$or": [{"last_sync_queue_id": {"$lt": job['queue_id']}},
+                     {"last_sync_queue_id": {"$exists": False}}]},
+            {"$set": update_set_doc},
+            upsert=True # upsert: true will create a new doc if no match found
+        ))
+    queue_ids = [job['queue_id'] for job in jobs]
+    if errors is None:
+        errors = {}
+    # Unordered writes may be applied in any order: only safe when every entity appears once
+    ordered = len({job[id_field] for job in jobs}) != len(jobs)
+    try:
+        mongo_coll.bulk_write(operations, ordered=ordered)
+        return queue_ids, []
+    except BulkWriteError as e:
+        write_errors = e.details.get('writeErrors', [])
+        # Duplicate key on the guarded upsert = a newer change already won; not a failure
+        stale_positions = {error['index'] for error in write_errors if error.get('code') == 11000}
+        failed_positions = {error['index'] for error in write_errors} - stale_positions
+        for error in write_errors:
+            if error['index'] in failed_positions:
+                logging.error(f"Sync failed for {jobs[error['index']][id_field]}: {error.get('errmsg')}")
+                errors[queue_ids[error['index']]] = error.get('errmsg')
+        # A write concern error means the outcome of every operation is unknown
+        if e.details.get('writeConcernErrors'):
+            logging.error(f"Write concern error on {queue_table} batch: {e.details['writeConcernErrors']}")
+            errors.update({qid: 'write concern error' for qid in queue_ids})
+            return [], queue_ids
+        # An ordered batch stops at its first error; later operations never ran
+        attempted = len(jobs) if not ordered else min(error['index'] for error in write_errors) + 1
+        completed = [qid for i, qid in enumerate(queue_ids[:attempted]) if i not in failed_positions]
+        failed = [qid for i, qid in enumerate(queue_ids[:attempted]) if i in failed_positions]
+        return completed, failed
+    except Exception as e:
+        logging.error(f"Sync failed for {len(jobs)} {queue_table} jobs: {e}")
+        errors.update({qid: str(e) for qid in queue_ids})
+        return [], queue_ids
+
+def coalesce_jobs(jobs, id_field):
+    """
+    Last-write-wins per entity: every queue row carries the full row image,
+    so only the newest queue_id per id_field needs applying. Returns
+    (latest jobs in queue order, queue_ids of the superseded rows).
+    """
+    latest = {}
+    for job in jobs:
+        current = latest.get(job[id_field])
+        if current is None or job['queue_id'] > current['queue_id']:
+            latest[job[id_field]] = job
+    winners = sorted(latest.values(), key=lambda job: job['queue_id'])
+    winner_ids = {job['queue_id'] for job in winners}
+    superseded = [job['queue_id'] for job in jobs if job['queue_id'] not in winner_ids]
+    return winners, superseded
+
+def claim_jobs(maria_conn, queue_table, worker_id=WORKER_ID, limit=SYNC_BATCH_SIZE):
+    """
+    Leases up to `limit` PENDING rows that are due (fresh work and retries
+    whose backoff has elapsed, in queue order) or whose lease expired to this
+    worker. SELECT ... FOR UPDATE SKIP LOCKED lets concurrent workers claim
+    disjoint batches without waiting on each other; the claim is committed
+    before any Mongo work starts.
+    """
+    maria_conn.begin()
     try:
         with maria_conn.cursor() as cursor:
-            print(f"Checking {queue_table}...")
-            cursor.execute(f"SELECT * FROM {queue_table} WHERE sync_status = 'PENDING'")
-            pending_jobs = cursor.fetchall()
-
-            if not pending_jobs:
-                print(f"No pending jobs in {queue_table}.")
-                return
-
-            for job in pending_jobs:
-                queue_id = job['queue_id']
-                item_id = job[id_field]
-                
-                # The document to set, starting with the SQL ID for identification
-                # We will build this carefully based on existing MongoDB schema from migrate.py
-                update_set_doc = {
-                    mongo_id_field: item_id, # Ensure the identifying field is always present
-                    "last_synced_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                # --- Specific Mapping Logic based on your MongoDB Schema from migrate.py ---
-                if queue_table == "customer_sync_queue":
-                    # Map MariaDB first_name, last_name to MongoDB full_name
-                    first_name = clean_value(job.get("first_name", ""))
-                    last_name = clean_value(job.get("last_name", ""))
-                    update_set_doc["full_name"] = f"{first_name} {last_name}".strip()
-                    
-                    # Map MariaDB city, state, zipcode to MongoDB location sub-document
-                    update_set_doc["location.city"] = clean_value(job.get("city"))
-                    update_set_doc["location.state"] = clean_value(job.get("state"))
-                    update_set_doc["location.zip"] = clean_value(job.get("zipcode")) # Assuming 'zip' key for zipcode in location
-                    
-                    # Map other direct fields
-                    update_set_doc["email"] = clean_value(job.get("email"))
-                    # Note: registration_date is typically set once during initial migration, 
-                    # not updated by the sync queue unless you specifically want to sync it.
-                    # customer_preferences, social_media_handles, recent_activity_log are also generally not updated here.
-
-                elif queue_table == "product_sync_queue":
-                    # Map MariaDB fields directly to MongoDB fields for products
-                    update_set_doc["name"] = clean_value(job.get("product_name")) # Mapping to 'name' as per your migrate.py
-                    update_set_doc["price"] = float(job.get("price")) if job.get("price") is not None else 0.0
-                    # If 'category' can change, you'd add it here if category_name is in your product_sync_queue
-                    # update_set_doc["category"] = clean_value(job.get("category_name")) # If category_name is in queue
-                    
-                elif queue_table == "review_sync_queue":
-                    # Map MariaDB fields directly to MongoDB fields for reviews
-                    update_set_doc["customer_id_sql"] = job.get("customer_id") # Direct ID from MariaDB, keeping _sql suffix
-                    update_set_doc["product_id_sql"] = job.get("product_id") # Direct ID from MariaDB, keeping _sql suffix
-                    update_set_doc["rating"] = float(job.get("rating")) if job.get("rating") is not None else 0.0
-                    update_set_doc["review_text"] = clean_value(job.get("review_text"))
-                    # Convert date to ISODate string format if that's what migrate.py did
-                    review_date_val = job.get("review_date")
-                    if isinstance(review_date_val, (datetime, date)):
-                        update_set_doc["review_date"] = review_date_val.isoformat() # or .strftime('%Y-%m-%d')
-                    else:
-                        update_set_doc["review_date"] = review_date_val
-
-
-                try:
-                    # Filter by the mongo_id_field (e.g., customer_id_sql)
-                    # Use $set to update specific fields without overwriting the entire document
-                    mongo_coll.update_one(
-                        {mongo_id_field: item_id},
-                        {"$set": update_set_doc},
-                        upsert=True # upsert: true will create a new doc if no match found
-                    )
-                    
-                    cursor.execute(f"UPDATE {queue_table} SET sync_status = 'COMPLETED' WHERE queue_id = %s", (queue_id,))
-                    print(f"✅ Synced {queue_table} Item {item_id} (using {mongo_id_field})")
-                except Exception as e:
-                    logging.error(f"Sync failed for {item_id}: {e}")
-                    cursor.execute(f"UPDATE {queue_table} SET sync_status = 'FAILED' WHERE queue_id = %s", (queue_id,))
+            cursor.execute(f"""
+                SELECT * FROM {queue_table}
+                WHERE sync_status IN ('PENDING', 'IN_PROGRESS')
+                  AND ((sync_status = 'PENDING' AND (next_attempt_at IS NULL OR next_attempt_at <= NOW()))
+                       OR lease_until < NOW())
+                ORDER BY queue_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (limit,))
+            jobs = cursor.fetchall()
+            if jobs:
+                placeholders = ', '.join(['%s'] * len(jobs))
+                cursor.execute(f"""
+                    UPDATE {queue_table}
+                    SET sync_status = 'IN_PROGRESS', worker_id = %s,
+                        lease_until = NOW() + INTERVAL %s SECOND
+                    WHERE queue_id IN ({placeholders})
+                """, (worker_id, SYNC_LEASE_SECONDS, *[job['queue_id'] for job in jobs]))
+        maria_conn.commit()
+        return jobs
+    except Exception:
+        maria_conn.rollback()
+        raise
+
+def mark_status(cursor, queue_table, status, queue_ids, worker_id=WORKER_ID):
+    """
+    Sets sync_status for many queue rows with one UPDATE ... WHERE queue_id IN (...).
+    Only rows still leased to this worker are touched: if our lease expired
+    and another worker reclaimed a row, its outcome is theirs to record.
+    """
+    if queue_ids:
+        placeholders = ', '.join(['%s'] * len(queue_ids))
+        cursor.execute(
+            f"UPDATE {queue_table} SET sync_status = %s, lease_until = NULL "
+            f"WHERE queue_id IN ({placeholders}) AND worker_id = %s",
+            (status, *queue_ids, worker_id)
+        )
+
+def mark_failed(cursor, queue_table, errors, id_field, data_fields, worker_id=WORKER_ID):
+    """
+    Records failed attempts. Rows under SYNC_MAX_ATTEMPTS go back to PENDING
+    with next_attempt_at pushed out exponentially, so the retries are picked
+    up by a later claim in the same bulk batches as fresh work. Rows that
+    used their last attempt become FAILED and are copied to sync_dead_letter.
+    One UPDATE per distinct error message (a whole batch usually shares one).
+    """
+    by_message = {}
+    for queue_id, message in errors.items():
+        by_message.setdefault((message or 'unknown error')[:1000], []).append(queue_id)
+
+    for message, queue_ids in by_message.items():
+        placeholders = ', '.join(['%s'] * len(queue_ids))
+        # SET is evaluated left to right: the later expressions see the incremented attempts
+        cursor.execute(f"""
+            UPDATE {queue_table}
+            SET attempts = attempts + 1,
+                last_error = %s,
+                sync_status = IF(attempts >= %s, 'FAILED', 'PENDING'),
+                next_attempt_at = NOW() + INTERVAL LEAST(%s * POW(2, attempts - 1), %s) SECOND,
+                lease_until = NULL
+            WHERE queue_id IN ({placeholders}) AND worker_id = %s
+        """, (message, SYNC_MAX_ATTEMPTS, SYNC_RETRY_BASE_SECONDS, SYNC_RETRY_MAX_SECONDS,
+              *queue_ids, worker_id))
+
+    queue_ids = list(errors)
+    if queue_ids:
+        placeholders = ', '.join(['%s'] * len(queue_ids))
+        payload = ', '.join(f"'{field}', {field}" for field in data_fields)
+        cursor.execute(f"""
+            INSERT INTO sync_dead_letter (queue_table, queue_id, entity_id, payload, attempts, last_error)
+            SELECT %s, queue_id, {id_field}, JSON_OBJECT({payload}), attempts, last_error
+            FROM {queue_table}
+            WHERE queue_id IN ({placeholders}) AND worker_id = %s AND sync_status = 'FAILED'
+        """, (queue_table, *queue_ids, worker_id))
+        return cursor.rowcount
+    return 0
+
+def requeue_dead_letters(cursor, queue_table):
+    """Operator action: gives every dead-lettered job of a queue a fresh set of attempts."""
+    cursor.execute(f"""
+        UPDATE {queue_table} q
+        JOIN sync_dead_letter d ON d.queue_table = %s AND d.queue_id = q.queue_id AND d.requeued_at IS NULL
+        SET q.sync_status = 'PENDING', q.attempts = 0, q.next_attempt_at = NULL, d.requeued_at = NOW()
+    """, (queue_table,))
+    return cursor.rowcount
+
+def guard_index_ready(mongo_coll, mongo_collection_name, mongo_id_field):
+    """
+    Ensures the collection's indexes and reports whether the unique
+    mongo_id_field index exists. The last_sync_queue_id guard depends on it:
+    without it a guarded upsert that does not match inserts a duplicate
+    document instead of failing with E11000, so the queue must not be applied.
+    """
+    try:
+        ensure_indexes(mongo_coll, mongo_collection_name, verbose=False)
+    except Exception as e:
+        logging.error(f"Could not ensure indexes on {mongo_collection_name}: {e}")
+    try:
+        if has_unique_index(mongo_coll, mongo_id_field):
+            return True
+    except Exception as e:
+        logging.error(f"Could not read indexes of {mongo_collection_name}: {e}")
+    logging.error(f"No unique index on {mongo_collection_name}.{mongo_id_field}; not syncing it")
+    return False
+
+def process_queue(queue_table, mongo_collection_name, id_field, mongo_id_field, data_fields,
+                  maria_conn=None, mongo_coll=None, verbose=True):
+    """
+    Drains the PENDING rows of one queue. Opens (and closes) its own
+    connections unless the daemon passes long-lived ones in. Returns the
+    number of queue rows handled.
+    """
+    own_connections = maria_conn is None
+    if own_connections:
+        maria_conn = get_maria_connection()
+        mongo_coll = get_mongo_collection(mongo_collection_name)
+
+        if maria_conn is None or mongo_coll is None:
+            print(f"❌ Connection failed for {queue_table}")
+            return 0
+
+        # Every upsert below filters on mongo_id_field, and the stale-write guard needs it unique
+        if not guard_index_ready(mongo_coll, mongo_collection_name, mongo_id_field):
+            print(f"❌ {mongo_collection_name} has no unique {mongo_id_field} index; "
+                  f"{queue_table} stays PENDING (run Milestone5_mongo_indexes.py)")
+            maria_conn.close()
+            return 0
+
+    total_fetched = 0
+    try:
+        with maria_conn.cursor() as cursor:
+            if verbose:
+                print(f"Checking {queue_table}...")
+            total_completed = total_failed = total_coalesced = total_dead = 0
+            started_at = time.perf_counter()
+            while True:
+                pending_jobs = claim_jobs(maria_conn, queue_table)
+                if not pending_jobs:
+                    break
+
+                latest_jobs, superseded = coalesce_jobs(pending_jobs, id_field)
+                errors = {}
+                apply_started_at = time.perf_counter()
+                completed, failed = apply_jobs(mongo_coll, queue_table, latest_jobs, id_field, mongo_id_field, errors)
+                apply_seconds = time.perf_counter() - apply_started_at
+                # Superseded rows are done either way: a newer image of the same entity replaces them
+                mark_status(cursor, queue_table, 'COMPLETED', completed + superseded)
+                dead = mark_failed(cursor, queue_table, {qid: errors.get(qid) for qid in failed},
+                                   id_field, data_fields)
+                completed_ids = set(completed)
+                METRICS.observe_batch(
+                    queue_table, len(pending_jobs),
+                    [job for job in latest_jobs if job['queue_id'] in completed_ids], apply_seconds,
+                    failed=len(failed), coalesced=len(superseded), dead_lettered=dead
+                )
+                # Rows an ordered batch never reached go back to the queue right away
+                finished = set(completed) | set(failed)
+                mark_status(cursor, queue_table, 'PENDING',
+                            [job['queue_id'] for job in latest_jobs if job['queue_id'] not in finished])
+                total_fetched += len(pending_jobs)
+                total_coalesced += len(superseded)
+                total_completed += len(completed)
+                total_failed += len(failed)
+                total_dead += dead
+                print(f"✅ Synced {len(completed)} {queue_table} jobs in one batch (using {mongo_id_field})"
+                      + (f", {len(superseded)} coalesced" if superseded else "")
+                      + (f", {len(failed)} failed ({dead} dead-lettered)" if failed else ""))
+                if failed and not completed:
+                    break   # the target is likely down: leave the retries to their backoff
+
+            if not total_fetched:
+                if verbose:
+                    print(f"No pending jobs in {queue_table}.")
+                return 0
+            elapsed = time.perf_counter() - started_at
+            print(f"   {queue_table}: {total_fetched} events -> {total_completed} applied, "
+                  f"{total_coalesced} coalesced ({total_coalesced / total_fetched:.1%}), {total_failed} failed, "
+                  f"{total_dead} dead-lettered "
+                  f"({total_fetched / max(elapsed, 1e-9):,.0f} events/sec)")
 
     except Exception as e:
         print(f"❌ Error: {e}")
+        logging.error(f"Error processing {queue_table}: {e}")
     finally:
-        if maria_conn: maria_conn.close()
+        if own_connections and maria_conn: maria_conn.close()
+    return total_fetched
 
-if __name__ == "__main__":
-    # The 'data_fields' here are no longer used for direct mapping
-    # but rather indicate which fields from the SQL job should be available
-    # for custom mapping logic within process_queue.
-    sync_jobs = [
-        {
-            "queue_table": "product_sync_queue",
-            "mongo_collection": "product_catalog",
-            "id_field": "product_id",
-            "mongo_id_field": "product_id_sql",
-            "data_fields": ["product_name", "price"] # These are the fields from SQL queue
-        },
-        {
-            "queue_table": "customer_sync_queue",
-            "mongo_collection": "customer_profiles",
-            "id_field": "customer_id",
-            "mongo_id_field": "customer_id_sql",
-            "data_fields": ["first_name", "last_name", "email", "city", "state", "zipcode"] # These are fields from SQL queue
-        },
-        {
-            "queue_table": "review_sync_queue",
-            "mongo_collection": "reviews",
-            "id_field": "review_id",
-            "mongo_id_field": "review_id_sql",
-            "data_fields": ["customer_id", "product_id", "rating", "review_text", "review_date"] # These are fields from SQL queue
-        }
-    ]
-
-    for job in sync_jobs:
+# The 'data_fields' here are no longer used for direct mapping
+# but rather indicate which fields from the SQL job should be available
+# for custom mapping logic within process_queue.
+SYNC_JOBS = [
+    {
+        "queue_table": "product_sync_queue",
+        "mongo_collection": "product_catalog",
+        "id_field": "product_id",
+        "mongo_id_field": "product_id_sql",
+        "data_fields": ["product_name", "price"] # These are the fields from SQL queue
+    },
+    {
+        "queue_table": "customer_sync_queue",
+        "mongo_collection": "customer_profiles",
+        "id_field": "customer_id",
+        "mongo_id_field": "customer_id_sql",
+        "data_fields": ["first_name", "last_name", "email", "city", "state", "zipcode"] # These are fields from SQL queue
+    },
+    {
+        "queue_table": "review_sync_queue",
+        "mongo_collection": "reviews",
+        "id_field": "review_id",
+        "mongo_id_field": "review_id_sql",
+        "data_fields": ["customer_id", "product_id", "rating", "review_text", "review_date"] # These are fields from SQL queue
+    }
+]
+
+def refresh_pending_depth(cursor):
+    """Updates the PENDING-depth gauge of every queue (an idx_sync_status range count)."""
+    for job in SYNC_JOBS:
+        cursor.execute(f"SELECT COUNT(*) AS n FROM {job['queue_table']} WHERE sync_status = 'PENDING'")
+        METRICS.set_pending_depth(job["queue_table"], cursor.fetchone()['n'])
+
+def run_once():
+    for job in SYNC_JOBS:
         process_queue(
-            job["queue_table"], 
-            job["mongo_collection"], 
-            job["id_field"], 
-            job["mongo_id_field"], 
+            job["queue_table"],
+            job["mongo_collection"],
+            job["id_field"],
+            job["mongo_id_field"],
             job["data_fields"]
         )
-    
-    print("\nReal-time sync worker finished.")
\ No newline at end of file
+
+    if SYNC_METRICS_FILE:
+        maria_conn = get_maria_connection()
+        if maria_conn is not None:
+            try:
+                with maria_conn.cursor() as cursor:
+                    refresh_pending_depth(cursor)
+            finally:
+                maria_conn.close()
+        METRICS.write_snapshot()
+
+    print("\nReal-time sync worker finished.")
+
+class SyncDaemon:
+    """
+    Long-running worker: one MongoClient and one MariaDB connection for its
+    whole life, polling all queues in a loop. The poll interval doubles
+    (up to POLL_MAX_INTERVAL) while the queues are empty and snaps back to
+    POLL_MIN_INTERVAL as soon as there is work. SIGTERM/SIGINT finish the
+    current cycle and exit cleanly.
+    """
+
+    def __init__(self, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.stop_event = threading.Event()
+        self.mongo_client = None
+        self.maria_conn = None
+        self.metrics_due_at = 0.0
+        self.index_ready = {}         # mongo_collection -> unique guard index verified
+        self.index_retry_at = {}      # mongo_collection -> next check while it is missing
+
+    def stop(self, signum=None, frame=None):
+        print("\n🛑 Shutdown requested; finishing the current cycle...")
+        self.stop_event.set()
+
+    def connect(self):
+        """(Re)opens whichever connection is missing or dead."""
+        if self.mongo_client is None:
+            self.mongo_client = get_mongo_client()
+            self.index_ready, self.index_retry_at = {}, {}
+        if self.maria_conn is not None:
+            try:
+                self.maria_conn.ping(reconnect=True)
+            except Exception as e:
+                logging.error(f"MariaDB connection lost: {e}")
+                self.maria_conn = None
+        if self.maria_conn is None:
+            self.maria_conn = get_maria_connection()
+        return self.mongo_client is not None and self.maria_conn is not None
+
+    def collection_ready(self, job):
+        """
+        Checks (once, then every INDEX_RETRY_INTERVAL while missing) that the
+        job's collection has its unique guard index. Until it does, the
+        queue is skipped and its rows stay PENDING.
+        """
+        name = job["mongo_collection"]
+        if self.index_ready.get(name):
+            return True
+        if time.monotonic() < self.index_retry_at.get(name, 0.0):
+            return False
+        ready = guard_index_ready(self.mongo_client[MONGO_DB_NAME][name], name, job["mongo_id_field"])
+        self.index_ready[name] = ready
+        if not ready:
+            self.index_retry_at[name] = time.monotonic() + INDEX_RETRY_INTERVAL
+            print(f"❌ {name} has no unique {job['mongo_id_field']} index; "
+                  f"{job['queue_table']} stays PENDING (retry in {INDEX_RETRY_INTERVAL:.0f}s)")
+        return ready
+
+    def poll_once(self):
+        """One pass over every queue; returns the number of queue rows handled."""
+        handled = 0
+        for job in SYNC_JOBS:
+            if not self.collection_ready(job):
+                continue
+            handled += process_queue(
+                job["queue_table"],
+                job["mongo_collection"],
+                job["id_field"],
+                job["mongo_id_field"],
+                job["data_fields"],
+                maria_conn=self.maria_conn,
+                mongo_coll=self.mongo_client[MONGO_DB_NAME][job["mongo_collection"]],
+                verbose=False
+            )
+        return handled
+
+    def publish_metrics(self):
+        """Refreshes queue depth and the snapshot file every SYNC_METRICS_INTERVAL seconds."""
+        if time.monotonic() < self.metrics_due_at:
+            return
+        self.metrics_due_at = time.monotonic() + SYNC_METRICS_INTERVAL
+        try:
+            with self.maria_conn.cursor() as cursor:
+                refresh_pending_depth(cursor)
+            METRICS.write_snapshot()
+        except Exception as e:
+            logging.error(f"Could not publish metrics: {e}")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"🔄 Sync daemon started (poll {self.min_interval}s..{self.max_interval}s). Ctrl+C to stop.")
+        logging.info("Sync daemon started")
+        metrics_server = start_metrics_server(METRICS)
+        if metrics_server is not None:
+            print(f"📈 Metrics on http://0.0.0.0:{metrics_server.server_port}/metrics")
+        try:
+            while not self.stop_event.is_set():
+                if not self.connect():
+                    print("❌ Connection failed; retrying...")
+                    self.interval = self.max_interval
+                else:
+                    if self.poll_once():
+                        self.interval = self.min_interval   # busy: poll again right away
+                    else:
+                        self.interval = min(self.interval * 2, self.max_interval)
+                    self.publish_metrics()
+                self.stop_event.wait(self.interval)
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
+            if self.maria_conn is not None:
+                self.maria_conn.close()
+            if self.mongo_client is not None:
+                self.mongo_client.close()
+            logging.info("Sync daemon stopped")
+            print("Real-time sync daemon stopped.")
+
+def run_requeue():
+    maria_conn = get_maria_connection()
+    if maria_conn is None:
+        print("❌ Connection to MariaDB failed.")
+        return
+    try:
+        with maria_conn.cursor() as cursor:
+            for job in SYNC_JOBS:
+                print(f"♻️ Re-queued {requeue_dead_letters(cursor, job['queue_table'])} dead-lettered "
+                      f"{job['queue_table']} jobs.")
+    finally:
+        maria_conn.close()
+
+if __name__ == "__main__":
+    if "--requeue-dead-letters" in sys.argv:
+        run_requeue()
+    elif "--daemon" in sys.argv:
+        SyncDaemon().run()
+    else:
+        run_once()
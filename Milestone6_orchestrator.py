@@ -231,7 +231,7 @@ def main():
     print("\n" + "="*80)
     print("🎉 AetherMart Full Project Orchestration Complete! 🎉")
     print("All databases and initial data are set up.")
-    print("Now, you should run 'python3 mongo_sync_worker.py' in a separate terminal")
+    print("Now, you should run 'python3 mongo_sync_worker.py --daemon' in a separate terminal")
     print("to start the real-time synchronization process.")
     print("="*80 + "\n")
 
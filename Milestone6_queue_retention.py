@@ -0,0 +1,184 @@
+"""
+AetherMart M6: Sync Queue Retention & Metrics
+
+The *_sync_queue tables are RANGE-partitioned on queue_id (see
+Milestone6_sync2.sql). This maintenance job:
+  1. keeps QUEUE_SPARE_PARTITIONS empty partitions ahead of AUTO_INCREMENT
+     by splitting pmax, so new rows never pile up in the catch-all;
+  2. drops whole partitions whose rows are all finished and older than the
+     retention window -- one metadata operation instead of millions of
+     DELETEs. A partition still holding PENDING / IN_PROGRESS rows, or
+     FAILED rows younger than FAILED_RETENTION_DAYS, is kept. Only
+     partitions entirely below AUTO_INCREMENT whose ids were all handed
+     out longer ago than the retention window are candidates, so neither
+     the partition taking inserts nor the spares are ever dropped;
+  3. reports queue depth per status and the age of the oldest PENDING row.
+
+Run from cron (e.g. hourly):
+    python3 Milestone6_queue_retention.py            # maintain + report
+    python3 Milestone6_queue_retention.py --dry-run  # report what would be dropped
+    python3 Milestone6_queue_retention.py --metrics-only --json
+"""
+import argparse
+import json
+import os
+import sys
+
+from Milestone6_mongo_sync_worker import MARIA_DB_NAME, SYNC_JOBS, get_maria_connection
+
+# --- CONFIGURATION ---
+QUEUE_PARTITION_ROWS = 1000000   # queue_ids per partition; must match p0 in Milestone6_sync2.sql
+QUEUE_SPARE_PARTITIONS = 2
+COMPLETED_RETENTION_DAYS = float(os.environ.get('COMPLETED_RETENTION_DAYS', 2))
+FAILED_RETENTION_DAYS = float(os.environ.get('FAILED_RETENTION_DAYS', 14))
+
+QUEUE_TABLES = [job["queue_table"] for job in SYNC_JOBS]
+
+
+def queue_metrics(cursor, queue_table):
+    """Depth per sync_status and age (seconds) of the oldest PENDING row."""
+    cursor.execute(f"SELECT sync_status, COUNT(*) AS n FROM {queue_table} GROUP BY sync_status")
+    depth = {row['sync_status']: row['n'] for row in cursor.fetchall()}
+    cursor.execute(f"""
+        SELECT TIMESTAMPDIFF(SECOND, MIN(created_at), NOW()) AS age
+        FROM {queue_table} WHERE sync_status = 'PENDING'
+    """)
+    age = cursor.fetchone()['age']
+    return {'depth': depth, 'oldest_pending_age_seconds': age or 0}
+
+
+def list_partitions(cursor, queue_table):
+    """[(name, upper bound or None for MAXVALUE, approx rows)] in range order."""
+    cursor.execute("""
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS approx_rows
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (MARIA_DB_NAME, queue_table))
+    return [(row['name'], None if row['bound'] == 'MAXVALUE' else int(row['bound']), row['approx_rows'])
+            for row in cursor.fetchall()]
+
+
+def next_queue_id(cursor, queue_table):
+    """The table's AUTO_INCREMENT: the queue_id the next trigger insert receives."""
+    cursor.execute("""
+        SELECT AUTO_INCREMENT AS next_id FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+    """, (MARIA_DB_NAME, queue_table))
+    return cursor.fetchone()['next_id'] or 1
+
+
+def add_spare_partitions(cursor, queue_table, dry_run=False):
+    """Splits pmax until QUEUE_SPARE_PARTITIONS empty ranges lie beyond AUTO_INCREMENT."""
+    partitions = list_partitions(cursor, queue_table)
+    if not partitions:
+        print(f"⚠️ {queue_table} is not partitioned; re-apply Milestone6_sync2.sql.")
+        return []
+    next_id = next_queue_id(cursor, queue_table)
+
+    bounds = [bound for _, bound, _ in partitions if bound is not None]
+    highest = max(bounds) if bounds else 0
+    added = []
+    while highest < next_id + QUEUE_SPARE_PARTITIONS * QUEUE_PARTITION_ROWS:
+        highest += QUEUE_PARTITION_ROWS
+        added.append(highest)
+    if added and not dry_run:
+        new_ranges = ', '.join(f"PARTITION p{bound // QUEUE_PARTITION_ROWS - 1} VALUES LESS THAN ({bound})"
+                               for bound in added)
+        cursor.execute(f"""
+            ALTER TABLE {queue_table} REORGANIZE PARTITION pmax INTO (
+                {new_ranges}, PARTITION pmax VALUES LESS THAN MAXVALUE
+            )
+        """)
+    return added
+
+
+def droppable(cursor, queue_table, lower, upper):
+    """
+    True when every row in [lower, upper) is finished and past its retention
+    window, and the first row above the range is itself older than the
+    window. That row was inserted after every id in the range was handed
+    out, so no transaction can still be about to commit a row into it.
+    """
+    cursor.execute(f"""
+        SELECT created_at < NOW() - INTERVAL %s SECOND AS expired
+        FROM {queue_table}
+        WHERE queue_id >= %s
+        ORDER BY queue_id
+        LIMIT 1
+    """, (int(COMPLETED_RETENTION_DAYS * 86400), upper))
+    next_row = cursor.fetchone()
+    if not next_row or not next_row['expired']:
+        return False
+
+    cursor.execute(f"""
+        SELECT
+            COALESCE(SUM(sync_status IN ('PENDING', 'IN_PROGRESS')), 0) AS open_rows,
+            COALESCE(SUM(sync_status = 'FAILED'
+                         AND created_at > NOW() - INTERVAL %s SECOND), 0) AS recent_failed,
+            COALESCE(SUM(created_at > NOW() - INTERVAL %s SECOND), 0) AS recent_rows
+        FROM {queue_table}
+        WHERE queue_id >= %s AND queue_id < %s
+    """, (int(FAILED_RETENTION_DAYS * 86400), int(COMPLETED_RETENTION_DAYS * 86400), lower, upper))
+    row = cursor.fetchone()
+    return not (row['open_rows'] or row['recent_failed'] or row['recent_rows'])
+
+
+def drop_expired_partitions(cursor, queue_table, dry_run=False):
+    """Drops bounded partitions whose whole range is expired. Returns their names."""
+    next_id = next_queue_id(cursor, queue_table)
+    dropped = []
+    lower = 0
+    for name, bound, _ in list_partitions(cursor, queue_table):
+        if bound is None or bound > next_id:
+            break   # the partition taking inserts (holds AUTO_INCREMENT) and everything above it
+        # The scan below is pruned to this one partition by the queue_id range
+        if droppable(cursor, queue_table, lower, bound):
+            if not dry_run:
+                cursor.execute(f"ALTER TABLE {queue_table} DROP PARTITION {name}")
+            dropped.append(name)
+        else:
+            break   # keep ranges contiguous: stop at the first partition still in use
+        lower = bound
+    return dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync queue retention and metrics.")
+    parser.add_argument('--dry-run', action='store_true', help="report, but do not alter partitions")
+    parser.add_argument('--metrics-only', action='store_true', help="only print queue metrics")
+    parser.add_argument('--json', action='store_true', help="print metrics as JSON")
+    args = parser.parse_args()
+
+    maria_conn = get_maria_connection()
+    if maria_conn is None:
+        print("❌ Connection to MariaDB failed.")
+        sys.exit(1)
+
+    report = {}
+    try:
+        with maria_conn.cursor() as cursor:
+            for queue_table in QUEUE_TABLES:
+                entry = {}
+                if not args.metrics_only:
+                    entry['partitions_added'] = add_spare_partitions(cursor, queue_table, args.dry_run)
+                    entry['partitions_dropped'] = drop_expired_partitions(cursor, queue_table, args.dry_run)
+                entry.update(queue_metrics(cursor, queue_table))
+                report[queue_table] = entry
+    finally:
+        maria_conn.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+    for queue_table, entry in report.items():
+        depth = ', '.join(f"{status}={n}" for status, n in sorted(entry['depth'].items())) or 'empty'
+        print(f"📊 {queue_table}: {depth}; oldest PENDING {entry['oldest_pending_age_seconds']}s")
+        if not args.metrics_only:
+            verb = "would drop" if args.dry_run else "dropped"
+            print(f"   partitions: +{len(entry['partitions_added'])} ahead, "
+                  f"{verb} {entry['partitions_dropped'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
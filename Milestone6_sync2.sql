@@ -1,9 +1,38 @@
 -- ============================================================
 -- AetherMart M6: Real-time Sync - Consolidated & Order-Corrected
 -- Based on your milestone1.sql and generator.py
+--
+-- Sync workers lease queue rows (worker_id / lease_until) so several can
+-- run at once, and tag Mongo documents with last_sync_queue_id. Re-creating
+-- these tables restarts queue_id, so re-run the initial migration after
+-- applying this file (the orchestrator does both).
+--
+-- The queue tables are range-partitioned on queue_id, so finished work is
+-- removed with DROP PARTITION instead of row-by-row DELETEs;
+-- Milestone6_queue_retention.py adds partitions ahead of AUTO_INCREMENT
+-- and drops expired ones.
 -- ============================================================
 USE aethermart_db;
 
+-- ============================================================
+-- 0. DEAD-LETTER TABLE (shared by all queues)
+--    Jobs that failed SYNC_MAX_ATTEMPTS times; re-queue them with
+--    python3 Milestone6_mongo_sync_worker.py --requeue-dead-letters
+-- ============================================================
+DROP TABLE IF EXISTS sync_dead_letter;
+CREATE TABLE sync_dead_letter (
+    dead_letter_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    queue_table VARCHAR(64) NOT NULL,
+    queue_id INT NOT NULL,
+    entity_id INT NOT NULL,
+    payload JSON,
+    attempts INT NOT NULL,
+    last_error VARCHAR(1000),
+    failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    requeued_at DATETIME NULL,
+    KEY idx_dead_letter_queue (queue_table, queue_id)
+);
+
 -- ============================================================
 -- 1. PRODUCT SYNC LOGIC (Strictly Matching milestone1.sql)
 --    Table: Products (product_id, product_name, price)
@@ -14,9 +43,18 @@ CREATE TABLE product_sync_queue (
     product_id INT NOT NULL,
     product_name VARCHAR(255),
     price DECIMAL(10, 2),
-    sync_status VARCHAR(50) DEFAULT 'PENDING',
+    sync_status VARCHAR(50) DEFAULT 'PENDING',      -- PENDING -> IN_PROGRESS (leased) -> COMPLETED / FAILED
+    worker_id VARCHAR(100) NULL,                    -- sync worker holding the lease
+    lease_until DATETIME NULL,                      -- expired leases are reclaimed by any worker
+    attempts INT NOT NULL DEFAULT 0,                -- failed applies so far
+    next_attempt_at DATETIME NULL,                  -- retry backoff: not claimed before this time
+    last_error VARCHAR(1000) NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    KEY idx_sync_status (sync_status)
+    KEY idx_sync_status (sync_status, lease_until)  -- serves both PENDING scans and lease reclaims
+)
+PARTITION BY RANGE (queue_id) (
+    PARTITION p0 VALUES LESS THAN (1000000),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 DELIMITER //
@@ -67,9 +105,18 @@ CREATE TABLE customer_sync_queue (
     city VARCHAR(100),
     state VARCHAR(50),
     zipcode VARCHAR(20),
-    sync_status VARCHAR(50) DEFAULT 'PENDING',
+    sync_status VARCHAR(50) DEFAULT 'PENDING',      -- PENDING -> IN_PROGRESS (leased) -> COMPLETED / FAILED
+    worker_id VARCHAR(100) NULL,                    -- sync worker holding the lease
+    lease_until DATETIME NULL,                      -- expired leases are reclaimed by any worker
+    attempts INT NOT NULL DEFAULT 0,                -- failed applies so far
+    next_attempt_at DATETIME NULL,                  -- retry backoff: not claimed before this time
+    last_error VARCHAR(1000) NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    KEY idx_sync_status (sync_status)
+    KEY idx_sync_status (sync_status, lease_until)  -- serves both PENDING scans and lease reclaims
+)
+PARTITION BY RANGE (queue_id) (
+    PARTITION p0 VALUES LESS THAN (1000000),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 DELIMITER //
@@ -130,9 +177,18 @@ CREATE TABLE review_sync_queue (
     rating DECIMAL(3,2),
     review_text TEXT,
     review_date DATE,
-    sync_status VARCHAR(50) DEFAULT 'PENDING',
+    sync_status VARCHAR(50) DEFAULT 'PENDING',      -- PENDING -> IN_PROGRESS (leased) -> COMPLETED / FAILED
+    worker_id VARCHAR(100) NULL,                    -- sync worker holding the lease
+    lease_until DATETIME NULL,                      -- expired leases are reclaimed by any worker
+    attempts INT NOT NULL DEFAULT 0,                -- failed applies so far
+    next_attempt_at DATETIME NULL,                  -- retry backoff: not claimed before this time
+    last_error VARCHAR(1000) NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    KEY idx_sync_status (sync_status)
+    KEY idx_sync_status (sync_status, lease_until)  -- serves both PENDING scans and lease reclaims
+)
+PARTITION BY RANGE (queue_id) (
+    PARTITION p0 VALUES LESS THAN (1000000),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 DELIMITER //
@@ -0,0 +1,182 @@
+"""
+AetherMart M6: Sync Worker Metrics
+
+In-process metrics for the Mongo sync worker, per queue table:
+  - sync_apply_latency_seconds   histogram of bulk_write time per batch
+  - sync_lag_seconds             histogram of apply time - queue created_at per job
+  - sync_batch_size              histogram of queue rows claimed per batch
+  - sync_jobs_total{outcome=...} counters: synced / failed / coalesced / dead_lettered
+  - sync_pending_depth           gauge: PENDING rows (refreshed by the daemon)
+
+Exposed as Prometheus text on http://<host>:SYNC_METRICS_PORT/metrics (JSON
+on /metrics.json) and/or written periodically to SYNC_METRICS_FILE.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+SYNC_METRICS_PORT = int(os.environ.get('SYNC_METRICS_PORT', 0))      # 0 = no HTTP endpoint
+SYNC_METRICS_FILE = os.environ.get('SYNC_METRICS_FILE', '')          # '' = no JSON snapshot file
+SYNC_METRICS_INTERVAL = 5.0                                          # seconds between depth refresh / file writes
+
+APPLY_SECONDS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+LAG_SECONDS_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600]
+BATCH_SIZE_BUCKETS = [1, 10, 50, 100, 250, 500, 1000]
+OUTCOMES = ['synced', 'failed', 'coalesced', 'dead_lettered']
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style: le=bound)."""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'mean': round(self.sum / self.count, 3) if self.count else 0.0,
+            'buckets': buckets,
+        }
+
+
+class QueueMetrics:
+    def __init__(self):
+        self.apply_seconds = Histogram(APPLY_SECONDS_BUCKETS)
+        self.lag_seconds = Histogram(LAG_SECONDS_BUCKETS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.jobs = {outcome: 0 for outcome in OUTCOMES}
+        self.pending_depth = None
+
+
+class SyncMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.started_at = time.time()
+
+    def _queue(self, queue_table):
+        return self.queues.setdefault(queue_table, QueueMetrics())
+
+    def observe_batch(self, queue_table, claimed, applied_jobs, apply_seconds,
+                      failed=0, coalesced=0, dead_lettered=0):
+        """Records one claimed batch. applied_jobs are the queue rows written to Mongo."""
+        now = datetime.now()   # queue created_at is the DB server's local time (same host)
+        with self.lock:
+            queue = self._queue(queue_table)
+            queue.batch_size.observe(claimed)
+            queue.apply_seconds.observe(apply_seconds)
+            for job in applied_jobs:
+                if job.get('created_at') is not None:
+                    queue.lag_seconds.observe(max(0.0, (now - job['created_at']).total_seconds()))
+            queue.jobs['synced'] += len(applied_jobs)
+            queue.jobs['failed'] += failed
+            queue.jobs['coalesced'] += coalesced
+            queue.jobs['dead_lettered'] += dead_lettered
+
+    def set_pending_depth(self, queue_table, depth):
+        with self.lock:
+            self._queue(queue_table).pending_depth = depth
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'queues': {
+                    table: {
+                        'jobs': dict(queue.jobs),
+                        'pending_depth': queue.pending_depth,
+                        'apply_latency_seconds': queue.apply_seconds.snapshot(),
+                        'lag_seconds': queue.lag_seconds.snapshot(),
+                        'batch_size': queue.batch_size.snapshot(),
+                    }
+                    for table, queue in self.queues.items()
+                },
+            }
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram(name, help_text, key):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for table, queue in snapshot['queues'].items():
+                data = queue[key]
+                for bound, count in data['buckets'].items():
+                    lines.append(f'{name}_bucket{{queue="{table}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{queue="{table}"}} {data["sum"]}')
+                lines.append(f'{name}_count{{queue="{table}"}} {data["count"]}')
+
+        histogram('sync_apply_latency_seconds', 'Mongo bulk_write time per batch.', 'apply_latency_seconds')
+        histogram('sync_lag_seconds', 'Queue created_at to Mongo apply, per job.', 'lag_seconds')
+        histogram('sync_batch_size', 'Queue rows claimed per batch.', 'batch_size')
+
+        lines.append("# HELP sync_jobs_total Queue rows handled, by outcome.")
+        lines.append("# TYPE sync_jobs_total counter")
+        for table, queue in snapshot['queues'].items():
+            for outcome, count in queue['jobs'].items():
+                lines.append(f'sync_jobs_total{{queue="{table}",outcome="{outcome}"}} {count}')
+
+        lines.append("# HELP sync_pending_depth PENDING rows in the queue table.")
+        lines.append("# TYPE sync_pending_depth gauge")
+        for table, queue in snapshot['queues'].items():
+            if queue['pending_depth'] is not None:
+                lines.append(f'sync_pending_depth{{queue="{table}"}} {queue["pending_depth"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self, path=SYNC_METRICS_FILE):
+        """Atomically replaces the JSON snapshot file."""
+        if not path:
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def start_metrics_server(metrics, port=SYNC_METRICS_PORT):
+    """Serves /metrics (Prometheus) and /metrics.json from a daemon thread."""
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = metrics.render_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(metrics.snapshot()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass   # keep scrapes out of the console
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    threading.Thread(target=server.serve_forever, name='sync-metrics', daemon=True).start()
+    return server
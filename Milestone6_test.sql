@@ -84,3 +84,54 @@ SELECT * from data_quality_logs;
 SELECT * FROM v_rbac_audit LIMIT 5;
 SELECT * from data_dictionary;
 SELECT * FROM v_customers_masked ESC LIMIT 5;
+
+
+-- //SYNC WORKER (offline checks: coalescing, stale-write guard, dead-letter SQL)
+
+python3 Milestone6_test_sync_worker.py
+
+-- //QUEUE STATE (leases, retries, dead letters)
+
+SELECT sync_status, COUNT(*) FROM product_sync_queue GROUP BY sync_status;
+SELECT queue_id, product_id, sync_status, worker_id, lease_until, attempts, next_attempt_at, last_error
+FROM product_sync_queue ORDER BY queue_id DESC LIMIT 10;
+SELECT * FROM sync_dead_letter ORDER BY dead_letter_id DESC LIMIT 10;
+
+-- //COALESCING + STALE GUARD: two changes to one product, newest wins
+
+UPDATE Products SET price = 160.99 WHERE product_id = 101;
+UPDATE Products SET price = 161.99 WHERE product_id = 101;
+
+python3 Milestone6_mongo_sync_worker.py
+
+SELECT queue_id, price, sync_status FROM product_sync_queue WHERE product_id = 101 ORDER BY queue_id DESC LIMIT 2;
+-- both COMPLETED (the older one coalesced)
+
+db.product_catalog.find({ "product_id_sql": 101 }, { price: 1, last_sync_queue_id: 1 });
+-- price 161.99, last_sync_queue_id = the newer queue_id
+
+-- //DEAD LETTER: make Mongo reject the write, burn the last attempt
+
+db.runCommand({ collMod: "product_catalog", validator: { price: { $lt: 1000 } } });
+
+UPDATE Products SET price = 5000.00 WHERE product_id = 101;
+UPDATE product_sync_queue SET attempts = 5   -- SYNC_MAX_ATTEMPTS - 1
+WHERE product_id = 101 AND sync_status = 'PENDING';
+
+python3 Milestone6_mongo_sync_worker.py
+
+SELECT queue_id, sync_status, attempts, last_error FROM product_sync_queue
+WHERE product_id = 101 ORDER BY queue_id DESC LIMIT 1;
+-- FAILED, attempts = 6
+SELECT queue_table, queue_id, entity_id, payload, attempts, last_error FROM sync_dead_letter
+WHERE queue_table = 'product_sync_queue' ORDER BY dead_letter_id DESC LIMIT 1;
+
+db.runCommand({ collMod: "product_catalog", validator: {} });
+UPDATE Products SET price = 161.99 WHERE product_id = 101;
+
+python3 Milestone6_mongo_sync_worker.py --requeue-dead-letters
+python3 Milestone6_mongo_sync_worker.py
+
+SELECT requeued_at FROM sync_dead_letter ORDER BY dead_letter_id DESC LIMIT 1;
+db.product_catalog.find({ "product_id_sql": 101 }, { price: 1, last_sync_queue_id: 1 });
+-- price 161.99: the requeued 5000.00 row is superseded by the later change (coalesced)
@@ -0,0 +1,191 @@
+"""
+AetherMart M6: Offline checks for the sync worker's apply path
+
+Exercises the worker's apply path without MariaDB or MongoDB: a small
+in-memory collection emulates the unique *_id_sql index and the
+last_sync_queue_id guard (returning BulkWriteError like a real server).
+apply_jobs builds its operations through RecordedUpdate instead of
+pymongo.UpdateOne, so the fake reads plain attributes rather than
+pymongo internals. The live end-to-end walkthrough is in Milestone6_test.sql.
+
+    python3 Milestone6_test_sync_worker.py
+"""
+import sys
+import types
+from contextlib import contextmanager
+
+from pymongo.errors import BulkWriteError
+
+import Milestone6_mongo_sync_worker as worker
+
+QUEUE_TABLE = "product_sync_queue"
+ID_FIELD = "product_id"
+MONGO_ID_FIELD = "product_id_sql"
+DATA_FIELDS = ["product_id", "product_name", "price"]
+
+
+class RecordedUpdate:
+    """Stands in for pymongo.UpdateOne(filter, update, upsert=...) inside apply_jobs."""
+
+    def __init__(self, filter, update, upsert=False):
+        self.filter = filter
+        self.update = update
+        self.upsert = upsert
+
+
+@contextmanager
+def recorded_operations():
+    """Points the worker's pymongo name at RecordedUpdate for the duration."""
+    real_pymongo = worker.pymongo
+    worker.pymongo = types.SimpleNamespace(UpdateOne=RecordedUpdate)
+    try:
+        yield
+    finally:
+        worker.pymongo = real_pymongo
+
+
+def apply(coll, jobs, errors=None):
+    with recorded_operations():
+        return worker.apply_jobs(coll, QUEUE_TABLE, jobs, ID_FIELD, MONGO_ID_FIELD, errors)
+
+
+class FakeCollection:
+    """
+    Applies UpdateOne(upsert=True) like MongoDB with a unique index on
+    MONGO_ID_FIELD: a guarded filter that matches nothing upserts, and the
+    upsert collides with the existing document (E11000). `fail_ids` makes
+    writes for those entities fail with another error code.
+    """
+
+    def __init__(self, docs=None, fail_ids=()):
+        self.docs = {doc[MONGO_ID_FIELD]: dict(doc) for doc in (docs or [])}
+        self.fail_ids = set(fail_ids)
+        self.calls = []
+
+    def _matches(self, doc, query):
+        for key, value in query.items():
+            if key == "$or":
+                if not any(self._matches(doc, branch) for branch in value):
+                    return False
+            elif isinstance(value, dict) and "$lt" in value:
+                if key not in doc or not doc[key] < value["$lt"]:
+                    return False
+            elif isinstance(value, dict) and "$exists" in value:
+                if (key in doc) != value["$exists"]:
+                    return False
+            elif doc.get(key) != value:
+                return False
+        return True
+
+    def bulk_write(self, operations, ordered=True):
+        self.calls.append({'count': len(operations), 'ordered': ordered})
+        write_errors = []
+        for index, op in enumerate(operations):
+            query, update = op.filter, op.update
+            entity_id = query[MONGO_ID_FIELD]
+            if entity_id in self.fail_ids:
+                write_errors.append({'index': index, 'code': 121, 'errmsg': 'Document failed validation'})
+            elif entity_id in self.docs and self._matches(self.docs[entity_id], query):
+                self.docs[entity_id].update(update["$set"])
+            elif entity_id in self.docs:
+                write_errors.append({'index': index, 'code': 11000, 'errmsg': 'E11000 duplicate key error'})
+            else:
+                self.docs[entity_id] = dict(update["$set"])
+            if write_errors and ordered:
+                break
+        if write_errors:
+            raise BulkWriteError({'writeErrors': write_errors, 'writeConcernErrors': []})
+
+
+class RecordingCursor:
+    def __init__(self, rowcount=0):
+        self.statements = []
+        self.rowcount = rowcount
+
+    def execute(self, sql, args=None):
+        self.statements.append((' '.join(sql.split()), args))
+
+
+def job(queue_id, product_id, price):
+    return {'queue_id': queue_id, ID_FIELD: product_id, 'product_name': f"Product {product_id}", 'price': price}
+
+
+def check_coalescing():
+    jobs = [job(1, 101, 10), job(2, 102, 20), job(3, 101, 11), job(4, 101, 12), job(5, 103, 30)]
+    winners, superseded = worker.coalesce_jobs(jobs, ID_FIELD)
+    assert [j['queue_id'] for j in winners] == [2, 4, 5], winners      # newest per entity, queue order
+    assert superseded == [1, 3], superseded
+    assert [j['price'] for j in winners if j[ID_FIELD] == 101] == [12]
+
+
+def check_ordering():
+    coll = FakeCollection()
+    apply(coll, [job(1, 101, 10), job(2, 102, 20)])
+    apply(coll, [job(3, 101, 11), job(4, 101, 12)])
+    assert [call['ordered'] for call in coll.calls] == [False, True], coll.calls   # ordered only on repeats
+    assert coll.docs[101]['price'] == 12.0 and coll.docs[101]['last_sync_queue_id'] == 4
+
+
+def check_stale_guard():
+    # Another worker already applied queue_id 9 for product 101
+    coll = FakeCollection(docs=[{MONGO_ID_FIELD: 101, 'price': 99.0, 'last_sync_queue_id': 9}])
+    errors = {}
+    completed, failed = apply(coll, [job(5, 101, 10), job(6, 102, 20)], errors)
+    assert coll.docs[101]['price'] == 99.0, "an older change overwrote a newer one"
+    assert completed == [5, 6] and failed == [] and errors == {}, (completed, failed, errors)  # E11000 = stale
+
+    completed, failed = apply(coll, [job(10, 101, 11)])
+    assert completed == [10] and coll.docs[101]['price'] == 11.0
+
+
+def check_failures():
+    coll = FakeCollection(fail_ids={102})
+    errors = {}
+    completed, failed = apply(coll, [job(1, 101, 10), job(2, 102, 20), job(3, 103, 30)], errors)
+    assert completed == [1, 3] and failed == [2], (completed, failed)   # unordered: only its own row fails
+    assert errors == {2: 'Document failed validation'}, errors
+
+    # Ordered (repeated entity): rows after the first error were never attempted
+    coll = FakeCollection(fail_ids={102})
+    completed, failed = apply(coll, [job(1, 101, 10), job(2, 102, 20), job(3, 101, 11)])
+    assert completed == [1] and failed == [2], (completed, failed)
+
+
+def check_dead_letter():
+    cursor = RecordingCursor(rowcount=1)
+    dead = worker.mark_failed(cursor, QUEUE_TABLE, {2: 'Document failed validation', 7: None},
+                              ID_FIELD, DATA_FIELDS)
+    assert dead == 1
+    updates = [(sql, args) for sql, args in cursor.statements if sql.startswith(f"UPDATE {QUEUE_TABLE}")]
+    assert len(updates) == 2, updates                        # one UPDATE per distinct message
+    for sql, args in updates:
+        assert "attempts = attempts + 1" in sql and "IF(attempts >= %s, 'FAILED', 'PENDING')" in sql
+        assert args[1] == worker.SYNC_MAX_ATTEMPTS and args[-1] == worker.WORKER_ID
+    assert {args[0] for _, args in updates} == {'Document failed validation', 'unknown error'}
+    sql, args = cursor.statements[-1]
+    assert sql.startswith("INSERT INTO sync_dead_letter") and "sync_status = 'FAILED'" in sql
+    assert "JSON_OBJECT('product_id', product_id, 'product_name', product_name, 'price', price)" in sql
+    assert args == (QUEUE_TABLE, 2, 7, worker.WORKER_ID), args
+
+    cursor = RecordingCursor()
+    assert worker.mark_failed(cursor, QUEUE_TABLE, {}, ID_FIELD, DATA_FIELDS) == 0 and not cursor.statements
+
+
+CHECKS = [check_coalescing, check_ordering, check_stale_guard, check_failures, check_dead_letter]
+
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"✅ {check.__name__}")
+        except AssertionError as e:
+            failures += 1
+            print(f"❌ {check.__name__}: {e}")
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} checks passed.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()